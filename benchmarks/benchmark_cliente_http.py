@@ -0,0 +1,100 @@
+# Benchmark do cliente HTTP: requests.get avulso (nova conexão a cada requisição)
+# x sessão compartilhada do cliente_http (conexões keep-alive reaproveitadas).
+#
+# Sobe um servidor HTTP/1.1 local que serve uma página HTML fixa e mede a latência
+# por requisição, em série e com várias threads.
+# Uso: python benchmarks/benchmark_cliente_http.py [--requisicoes 500] [--threads 1 8] [--atraso-ms 0]
+import argparse
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import cliente_http  # noqa: E402
+
+PAGINA = ('<html><head><title>Página de teste</title></head><body><article>'
+          + '<p>Como configurar a impressora de rede no escritório.</p>' * 200
+          + '</article></body></html>').encode('utf-8')
+
+class ManipuladorPagina(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Permite manter a conexão aberta entre requisições
+    # Cabeçalhos e corpo saem em escritas separadas; com Nagle, o ACK atrasado do
+    # cliente somaria ~40 ms a cada requisição numa conexão reaproveitada
+    disable_nagle_algorithm = True
+    atraso = 0.0
+
+    def do_GET(self):
+        if self.atraso:
+            time.sleep(self.atraso)
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(PAGINA)))
+        self.end_headers()
+        self.wfile.write(PAGINA)
+
+    def log_message(self, *args):
+        pass
+
+def medir(buscar, url, requisicoes, threads):
+    latencias = []
+
+    def uma_requisicao(_):
+        inicio = time.perf_counter()
+        resposta = buscar(url)
+        resposta.raise_for_status()
+        resposta.content
+        latencias.append(time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(uma_requisicao, range(requisicoes)))
+    total = time.perf_counter() - inicio
+    latencias.sort()
+    return {
+        'media_ms': statistics.mean(latencias) * 1000,
+        'p95_ms': latencias[int(len(latencias) * 0.95) - 1] * 1000,
+        'req_s': requisicoes / total,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do cliente HTTP compartilhado")
+    parser.add_argument('--requisicoes', type=int, default=500)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--atraso-ms', type=float, default=0, help="atraso do servidor por requisição")
+    args = parser.parse_args()
+
+    ManipuladorPagina.atraso = args.atraso_ms / 1000
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), ManipuladorPagina)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    host = f'127.0.0.1:{servidor.server_port}'
+    url = f'http://{host}/pagina'
+    # Mede só o custo das conexões: sem limite de taxa para o servidor local
+    cliente_http.LIMITES_POR_HOST[host] = (10 ** 9, 10 ** 9, max(args.threads))
+
+    cabecalhos = {'User-Agent': cliente_http.USER_AGENT}
+    clientes = [
+        ('requests.get', lambda endereco: requests.get(endereco, headers=cabecalhos, timeout=15)),
+        ('cliente_http', lambda endereco: cliente_http.get(endereco, respeitar_robots=False)),
+    ]
+
+    print(f"{'threads':>7} {'cliente':<14} {'média (ms)':>11} {'p95 (ms)':>9} {'req/s':>8}")
+    try:
+        for threads in args.threads:
+            for nome, buscar in clientes:
+                buscar(url).close()  # Aquecimento (abre a conexão da sessão)
+                resultado = medir(buscar, url, args.requisicoes, threads)
+                print(f"{threads:>7} {nome:<14} {resultado['media_ms']:>11.2f} "
+                      f"{resultado['p95_ms']:>9.2f} {resultado['req_s']:>8.0f}")
+    finally:
+        servidor.shutdown()
+
+if __name__ == '__main__':
+    main()
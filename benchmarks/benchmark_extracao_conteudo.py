@@ -0,0 +1,83 @@
+# Benchmark da extração do conteúdo principal de páginas HTML.
+#
+# Compara o motor de passada única (extracao_conteudo) com html.parser e lxml à
+# extração anterior (BeautifulSoup + select_one em cinco seletores), sobre um corpus
+# de páginas salvas (benchmarks/paginas por padrão; qualquer diretório com .html serve).
+# Uso: python benchmarks/benchmark_extracao_conteudo.py [--corpus DIR] [--repeticoes 20] [--mostrar]
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import extracao_conteudo  # noqa: E402
+
+def extrair_com_seletores(html, parser):
+    """A extração usada antes do motor de passada única, para comparação"""
+    soup = BeautifulSoup(html, parser)
+    titulo = soup.title.string.strip() if soup.title and soup.title.string else "Sem título"
+    conteudo = ""
+    for tag in ['article', 'main', 'div.content', 'div.main', 'section']:
+        elemento = soup.select_one(tag)
+        if elemento:
+            texto = elemento.get_text(strip=True)
+            if len(texto) > 100:
+                conteudo = texto
+                break
+    if not conteudo:
+        for script in soup(["script", "style", "nav", "header", "footer"]):
+            script.decompose()
+        conteudo = soup.get_text()
+    linhas = (linha.strip() for linha in conteudo.splitlines())
+    chunks = (phrase.strip() for linha in linhas for phrase in linha.split("  "))
+    texto_limpo = ' '.join(chunk for chunk in chunks if chunk)
+    return titulo, texto_limpo[:1500] + '...' if len(texto_limpo) > 1500 else texto_limpo
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da extração do conteúdo principal")
+    parser.add_argument('--corpus', type=Path, default=Path(__file__).resolve().parent / 'paginas')
+    parser.add_argument('--repeticoes', type=int, default=20)
+    parser.add_argument('--mostrar', action='store_true', help="mostrar o início do conteúdo extraído")
+    args = parser.parse_args()
+
+    paginas = {caminho.name: caminho.read_text(encoding='utf-8', errors='replace')
+               for caminho in sorted(args.corpus.glob('*.html'))}
+    if not paginas:
+        raise SystemExit(f"Nenhuma página .html em {args.corpus}")
+    total_bytes = sum(len(html.encode('utf-8')) for html in paginas.values())
+
+    motores = [
+        ('seletores + html.parser', lambda html: extrair_com_seletores(html, 'html.parser')),
+        ('passada única + html.parser', lambda html: extracao_conteudo.extrair_conteudo(html, parser='html.parser')),
+    ]
+    if extracao_conteudo.etree is not None:
+        motores += [
+            ('seletores + lxml', lambda html: extrair_com_seletores(html, 'lxml')),
+            ('passada única + lxml', lambda html: extracao_conteudo.extrair_conteudo(html, parser='lxml')),
+        ]
+    else:
+        print("lxml não instalado: apenas html.parser\n")
+
+    print(f"{len(paginas)} página(s), {total_bytes / 1024:.0f} KB, {args.repeticoes} repetição(ões)\n")
+    print(f"{'motor':<28} {'páginas/s':>10} {'MB/s':>7}")
+    for nome, extrair in motores:
+        inicio = time.perf_counter()
+        for _ in range(args.repeticoes):
+            for html in paginas.values():
+                extrair(html)
+        tempo = time.perf_counter() - inicio
+        print(f"{nome:<28} {len(paginas) * args.repeticoes / tempo:>10.0f} "
+              f"{total_bytes * args.repeticoes / tempo / 1024 / 1024:>7.2f}")
+
+    if args.mostrar:
+        for nome_pagina, html in paginas.items():
+            print(f"\n{nome_pagina}")
+            for nome, extrair in motores:
+                titulo, conteudo = extrair(html)
+                print(f"  {nome:<28} {conteudo[:90]!r}")
+
+if __name__ == '__main__':
+    main()
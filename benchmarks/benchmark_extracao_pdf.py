@@ -0,0 +1,67 @@
+# Benchmark da extração de texto de PDFs: PyPDF2 x PyMuPDF (sequencial e em paralelo).
+#
+# Gera um corpus de PDFs sintéticos com PyMuPDF e mede o tempo de cada motor.
+# Uso: python benchmarks/benchmark_extracao_pdf.py [--paginas 10 100 400] [--processos 4]
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import extracao_texto  # noqa: E402
+
+PALAVRAS = [
+    'rede', 'servidor', 'senha', 'impressora', 'backup', 'configuração', 'firewall',
+    'usuário', 'relatório', 'sistema', 'atualização', 'erro', 'banco', 'dados', 'acesso'
+]
+
+def gerar_pdf(caminho, paginas, linhas_por_pagina=45):
+    """Gerar um PDF com texto aleatório (semente fixa, para resultados comparáveis)"""
+    if extracao_texto.pymupdf is None:
+        raise SystemExit("PyMuPDF é necessário para gerar o corpus do benchmark")
+    aleatorio = random.Random(paginas)
+    documento = extracao_texto.pymupdf.open()
+    for _ in range(paginas):
+        pagina = documento.new_page()
+        linhas = [' '.join(aleatorio.choices(PALAVRAS, k=12)) for _ in range(linhas_por_pagina)]
+        pagina.insert_text((40, 40), '\n'.join(linhas), fontsize=9)
+    documento.save(caminho)
+    documento.close()
+
+def medir(funcao, repeticoes):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        texto = funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor, len(texto)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da extração de texto de PDFs")
+    parser.add_argument('--paginas', type=int, nargs='+', default=[10, 100, 400])
+    parser.add_argument('--processos', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    motores = [
+        ('PyPDF2', lambda caminho: extracao_texto.extrair_paginas_pdf(caminho, motor='pypdf2')),
+        ('PyMuPDF', lambda caminho: extracao_texto.extrair_paginas_pdf(caminho, motor='pymupdf')),
+        (f'PyMuPDF x{args.processos}', lambda caminho: extracao_texto.extrair_texto_pdf_paralelo(
+            caminho, processos=args.processos, motor='pymupdf')),
+    ]
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        print(f"{'páginas':>8} {'motor':<14} {'tempo (s)':>10} {'páginas/s':>10} {'caracteres':>11}")
+        for paginas in args.paginas:
+            caminho = os.path.join(diretorio, f'corpus_{paginas}.pdf')
+            gerar_pdf(caminho, paginas)
+            for nome, funcao in motores:
+                tempo, caracteres = medir(lambda: funcao(caminho), args.repeticoes)
+                print(f"{paginas:>8} {nome:<14} {tempo:>10.3f} {paginas / tempo:>10.0f} {caracteres:>11}")
+
+if __name__ == '__main__':
+    main()
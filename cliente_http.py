@@ -0,0 +1,272 @@
+# Cliente HTTP compartilhado pelas funções que acessam páginas externas.
+# Uma única sessão por processo mantém conexões keep-alive abertas por host
+# (sem novo handshake TCP/TLS a cada requisição), com novas tentativas e
+# resposta comprimida. Cada host tem um limite de taxa (token bucket) e de
+# requisições simultâneas, e o robots.txt é respeitado. Sem dependência do Streamlit.
+import os
+import threading
+import time
+import urllib.parse
+import urllib.robotparser
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+TIMEOUT_PADRAO_SEGUNDOS = 15
+
+# Tamanho dos pools: quantos hosts ficam com conexões guardadas e quantas conexões por host
+HOSTS_EM_POOL = int(os.environ.get('SISTEMA_SUPORTE_HTTP_HOSTS', 32))
+CONEXOES_POR_HOST = int(os.environ.get('SISTEMA_SUPORTE_HTTP_CONEXOES_POR_HOST', 10))
+TENTATIVAS = int(os.environ.get('SISTEMA_SUPORTE_HTTP_TENTATIVAS', 2))
+FATOR_ESPERA_TENTATIVAS = 0.5  # Espera 0,5 s, 1 s, 2 s... entre as tentativas
+
+# O urllib3 só descomprime brotli se um dos pacotes estiver instalado
+try:
+    import brotli  # noqa: F401
+    CODIFICACOES_ACEITAS = 'gzip, deflate, br'
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        CODIFICACOES_ACEITAS = 'gzip, deflate, br'
+    except ImportError:
+        CODIFICACOES_ACEITAS = 'gzip, deflate'
+
+CABECALHOS_PADRAO = {
+    'User-Agent': USER_AGENT,
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'pt-BR,pt;q=0.9,en;q=0.8',
+    'Accept-Encoding': CODIFICACOES_ACEITAS,
+}
+
+# Cortesia com cada host: taxa sustentada, rajada e requisições simultâneas
+REQUISICOES_POR_SEGUNDO_HOST = float(os.environ.get('SISTEMA_SUPORTE_HTTP_REQUISICOES_POR_SEGUNDO', 2))
+RAJADA_HOST = int(os.environ.get('SISTEMA_SUPORTE_HTTP_RAJADA', 4))
+SIMULTANEAS_POR_HOST = int(os.environ.get('SISTEMA_SUPORTE_HTTP_SIMULTANEAS_POR_HOST', 4))
+ESPERA_MAXIMA_FILA_SEGUNDOS = 10  # Acima disso a requisição é recusada em vez de esperar
+# Hosts que bloqueiam com facilidade: (requisições por segundo, rajada, simultâneas)
+LIMITES_POR_HOST = {
+    'html.duckduckgo.com': (1, 2, 2),
+}
+VALIDADE_ROBOTS_SEGUNDOS = 24 * 3600
+
+# Base de todos os erros de get(), para quem chama não precisar importar o requests
+ErroRequisicao = requests.exceptions.RequestException
+
+class FilaHostEsgotada(ErroRequisicao):
+    """O host já tem requisições demais na fila"""
+
+class BloqueadoPorRobots(ErroRequisicao):
+    """O robots.txt do host não permite acessar a URL"""
+
+class LimitadorHost:
+    """Token bucket (taxa e rajada) mais um limite de requisições simultâneas para um host"""
+
+    def __init__(self, taxa, rajada, simultaneas):
+        self.taxa = taxa
+        self.rajada = rajada
+        self.fichas = float(rajada)
+        self.atualizado_em = time.monotonic()
+        self._trava = threading.Lock()
+        self._vagas = threading.BoundedSemaphore(simultaneas)
+        # Métricas
+        self.requisicoes = 0
+        self.recusadas = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+
+    def _reservar_ficha(self, espera_maxima):
+        """Reservar uma ficha e retornar quanto esperar por ela; None se passaria do limite.
+        
+        As fichas podem ficar negativas: cada reserva entra no fim da fila.
+        """
+        with self._trava:
+            agora = time.monotonic()
+            self.fichas = min(self.rajada, self.fichas + (agora - self.atualizado_em) * self.taxa)
+            self.atualizado_em = agora
+            espera = max(0.0, (1 - self.fichas) / self.taxa)
+            if espera > espera_maxima:
+                return None
+            self.fichas -= 1
+            return espera
+
+    def adquirir(self, espera_maxima=ESPERA_MAXIMA_FILA_SEGUNDOS):
+        """Esperar a vez do host; retorna o tempo de fila em segundos"""
+        inicio = time.monotonic()
+        espera = self._reservar_ficha(espera_maxima)
+        if espera is None:
+            self._registrar_recusa()
+            raise FilaHostEsgotada(f"Fila do host excedeu {espera_maxima} s")
+        time.sleep(espera)
+        restante = espera_maxima - (time.monotonic() - inicio)
+        if not self._vagas.acquire(timeout=max(0.0, restante)):
+            with self._trava:
+                self.fichas = min(self.rajada, self.fichas + 1)  # Devolver a ficha não usada
+            self._registrar_recusa()
+            raise FilaHostEsgotada(f"Fila do host excedeu {espera_maxima} s")
+        espera_fila = time.monotonic() - inicio
+        with self._trava:
+            self.requisicoes += 1
+            self.espera_total += espera_fila
+            self.espera_maxima = max(self.espera_maxima, espera_fila)
+        return espera_fila
+
+    def liberar(self):
+        self._vagas.release()
+
+    def _registrar_recusa(self):
+        with self._trava:
+            self.recusadas += 1
+
+_limitadores = {}
+_trava_limitadores = threading.Lock()
+_robots = {}  # 'esquema://host' -> (RobotFileParser, instante da leitura)
+_trava_robots = threading.Lock()
+_travas_robots = {}  # 'esquema://host' -> trava da leitura do robots.txt
+_bloqueadas_robots = {}  # host -> requisições recusadas pelo robots.txt
+
+def obter_limitador(host):
+    with _trava_limitadores:
+        limitador = _limitadores.get(host)
+        if limitador is None:
+            taxa, rajada, simultaneas = LIMITES_POR_HOST.get(
+                host, (REQUISICOES_POR_SEGUNDO_HOST, RAJADA_HOST, SIMULTANEAS_POR_HOST)
+            )
+            limitador = _limitadores[host] = LimitadorHost(taxa, rajada, simultaneas)
+        return limitador
+
+def _ler_robots(origem, host):
+    """Baixar e interpretar o robots.txt (regras do RobotFileParser.read para erros HTTP)"""
+    regras = urllib.robotparser.RobotFileParser(origem + '/robots.txt')
+    limitador = obter_limitador(host)
+    limitador.adquirir()
+    try:
+        resposta = obter_sessao().get(origem + '/robots.txt', timeout=TIMEOUT_PADRAO_SEGUNDOS)
+    except requests.exceptions.RequestException:
+        regras.allow_all = True  # Sem robots.txt acessível: nada é proibido
+        return regras
+    finally:
+        limitador.liberar()
+    if resposta.status_code in (401, 403):
+        regras.disallow_all = True
+    elif resposta.status_code >= 400:
+        regras.allow_all = True
+    else:
+        regras.parse(resposta.text.splitlines())
+        regras.modified()  # Sem a data de leitura, can_fetch() nega tudo
+    return regras
+
+def robots_permite(url):
+    """Consultar o robots.txt do host (guardado em cache por VALIDADE_ROBOTS_SEGUNDOS)"""
+    partes = urllib.parse.urlsplit(url)
+    origem = f'{partes.scheme}://{partes.netloc}'
+    with _trava_robots:
+        em_cache = _robots.get(origem)
+        trava_origem = _travas_robots.setdefault(origem, threading.Lock())
+    if em_cache is None or time.monotonic() - em_cache[1] >= VALIDADE_ROBOTS_SEGUNDOS:
+        # Uma única leitura por host; as outras threads esperam por ela
+        with trava_origem:
+            with _trava_robots:
+                em_cache = _robots.get(origem)
+            if em_cache is None or time.monotonic() - em_cache[1] >= VALIDADE_ROBOTS_SEGUNDOS:
+                em_cache = (_ler_robots(origem, partes.netloc.lower()), time.monotonic())
+                with _trava_robots:
+                    _robots[origem] = em_cache
+    return em_cache[0].can_fetch(USER_AGENT, url)
+
+def obter_metricas_limitador():
+    """Métricas por host: requisições, recusas, tempo de fila médio/máximo e bloqueios do robots.txt"""
+    with _trava_limitadores:
+        limitadores = dict(_limitadores)
+    metricas = []
+    for host, limitador in sorted(limitadores.items()):
+        with limitador._trava:
+            metricas.append({
+                'host': host,
+                'requisicoes': limitador.requisicoes,
+                'recusadas': limitador.recusadas,
+                'bloqueadas_robots': _bloqueadas_robots.get(host, 0),
+                'espera_media_s': limitador.espera_total / limitador.requisicoes if limitador.requisicoes else 0.0,
+                'espera_maxima_s': limitador.espera_maxima,
+            })
+    return metricas
+
+_sessao = None
+_trava_sessao = threading.Lock()
+
+def criar_sessao(hosts=None, conexoes_por_host=None, tentativas=None):
+    """Nova sessão com pool de conexões por host e novas tentativas com espera exponencial.
+    
+    As novas tentativas do urllib3 não passam pelo LimitadorHost: um 429 (pedido do
+    host para diminuir o ritmo) volta para quem chamou em vez de ser repetido.
+    """
+    politica_tentativas = Retry(
+        total=TENTATIVAS if tentativas is None else tentativas,
+        backoff_factor=FATOR_ESPERA_TENTATIVAS,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset({'GET', 'HEAD'}),
+        respect_retry_after_header=False,  # Um Retry-After longo prenderia a página do usuário
+        raise_on_status=False,  # Após a última tentativa, a resposta volta para quem chamou
+    )
+    adaptador = HTTPAdapter(
+        pool_connections=hosts or HOSTS_EM_POOL,
+        pool_maxsize=conexoes_por_host or CONEXOES_POR_HOST,
+        max_retries=politica_tentativas,
+    )
+    sessao = requests.Session()
+    sessao.mount('http://', adaptador)
+    sessao.mount('https://', adaptador)
+    sessao.headers.update(CABECALHOS_PADRAO)
+    return sessao
+
+def obter_sessao():
+    """Sessão compartilhada do processo, criada na primeira utilização"""
+    global _sessao
+    if _sessao is None:
+        with _trava_sessao:
+            if _sessao is None:
+                _sessao = criar_sessao()
+    return _sessao
+
+def configurar_cliente_http(**opcoes):
+    """Recriar a sessão compartilhada com outros tamanhos de pool ou tentativas"""
+    global _sessao
+    with _trava_sessao:
+        anterior, _sessao = _sessao, criar_sessao(**opcoes)
+    if anterior is not None:
+        anterior.close()
+
+def get(url, timeout=TIMEOUT_PADRAO_SEGUNDOS, respeitar_robots=True, **kwargs):
+    """requests.get pela sessão compartilhada, na vez do host e se o robots.txt permitir.
+    
+    Com stream=True, a vaga do host só é liberada quando a resposta for fechada.
+    """
+    host = urllib.parse.urlsplit(url).netloc.lower()
+    if respeitar_robots and not robots_permite(url):
+        with _trava_robots:
+            _bloqueadas_robots[host] = _bloqueadas_robots.get(host, 0) + 1
+        raise BloqueadoPorRobots(f"robots.txt de {host} não permite acessar {url}")
+    
+    limitador = obter_limitador(host)
+    limitador.adquirir()
+    try:
+        resposta = obter_sessao().get(url, timeout=timeout, **kwargs)
+    except BaseException:
+        limitador.liberar()
+        raise
+    if not kwargs.get('stream'):
+        limitador.liberar()
+        return resposta
+    
+    fechar_original = resposta.close
+    liberada = threading.Event()
+    def fechar():
+        try:
+            fechar_original()
+        finally:
+            if not liberada.is_set():
+                liberada.set()
+                limitador.liberar()
+    resposta.close = fechar
+    return resposta
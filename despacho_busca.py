@@ -0,0 +1,294 @@
+# Despacho das buscas na web entre vários provedores, sem dependência do Streamlit.
+#
+# Cada provedor tem um disjuntor (circuit breaker): após falhas seguidas ele deixa de
+# ser chamado por um tempo. Toda a busca tem um prazo: cada provedor recebe apenas o
+# tempo que ainda resta. Há dois modos:
+# - buscar_em_todos(): consulta todos ao mesmo tempo e funde os resultados por
+#   reciprocal rank fusion (RRF), sem repetir a mesma URL;
+# - buscar(): tenta em ordem; se o atual não responder dentro do p95 da sua latência
+#   recente, o próximo é disparado em paralelo ("hedged") e vale a primeira resposta.
+# Os dois se combinam com ProvedorEscalonado: provedores equivalentes (o mesmo índice por
+# caminhos diferentes) entram na fusão como um só, consultado por buscar().
+import threading
+import time
+import urllib.parse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+PRAZO_BUSCA_SEGUNDOS = 8
+FALHAS_PARA_ABRIR = 3  # Falhas seguidas que abrem o disjuntor
+TEMPO_ABERTO_SEGUNDOS = 30  # Tempo sem chamar o motor antes de uma nova tentativa
+ESPERA_HEDGE_PADRAO_SEGUNDOS = 2.0  # Usada enquanto não há latências suficientes
+AMOSTRAS_LATENCIA = 50
+AMOSTRAS_MINIMAS_P95 = 5
+RRF_K = 60  # Constante da fusão: 1 / (RRF_K + posição) por provedor
+PARAMETROS_RASTREAMENTO = ('utm_', 'fbclid', 'gclid')
+
+class DisjuntorCircuito:
+    """Estados: 'fechado' (normal), 'aberto' (motor ignorado) e 'meio-aberto' (uma chamada de teste)"""
+
+    def __init__(self, falhas_para_abrir=FALHAS_PARA_ABRIR, tempo_aberto=TEMPO_ABERTO_SEGUNDOS, relogio=time.monotonic):
+        self.falhas_para_abrir = falhas_para_abrir
+        self.tempo_aberto = tempo_aberto
+        self.relogio = relogio
+        self.estado = 'fechado'
+        self.falhas_seguidas = 0
+        self.aberto_em = 0.0
+        self._trava = threading.Lock()
+
+    def permite(self):
+        """Indica se o motor pode ser chamado agora; no meio-aberto, só uma chamada passa"""
+        with self._trava:
+            if self.estado == 'fechado':
+                return True
+            if self.estado == 'aberto' and self.relogio() - self.aberto_em >= self.tempo_aberto:
+                self.estado = 'meio-aberto'
+                return True
+            return False
+
+    def liberar_teste(self):
+        """A chamada de teste não chegou a ser feita (cancelada ou fora do prazo): volta ao
+        'aberto', já vencido, e a próxima chamada pode ser o teste"""
+        with self._trava:
+            if self.estado == 'meio-aberto':
+                self.estado = 'aberto'
+
+    def registrar_sucesso(self):
+        with self._trava:
+            self.estado = 'fechado'
+            self.falhas_seguidas = 0
+
+    def registrar_falha(self):
+        with self._trava:
+            self.falhas_seguidas += 1
+            if self.estado == 'meio-aberto' or self.falhas_seguidas >= self.falhas_para_abrir:
+                self.estado = 'aberto'
+                self.aberto_em = self.relogio()
+
+class HistoricoLatencia:
+    """Latências das últimas respostas bem-sucedidas de um motor"""
+
+    def __init__(self, amostras=AMOSTRAS_LATENCIA):
+        self._latencias = deque(maxlen=amostras)
+        self._trava = threading.Lock()
+
+    def registrar(self, segundos):
+        with self._trava:
+            self._latencias.append(segundos)
+
+    def p95(self, padrao=ESPERA_HEDGE_PADRAO_SEGUNDOS):
+        with self._trava:
+            if len(self._latencias) < AMOSTRAS_MINIMAS_P95:
+                return padrao
+            ordenadas = sorted(self._latencias)
+        return ordenadas[int(0.95 * (len(ordenadas) - 1))]
+
+class ProvedorBusca:
+    """Interface dos provedores de busca.
+    
+    buscar() retorna a lista ordenada de resultados ({'title', 'href', 'body'}) ou
+    levanta exceção; timeout é o tempo que ainda resta até o prazo da busca.
+    local indica um provedor sem acesso à rede (não conta como resposta da web).
+    """
+    nome = None
+    local = False
+
+    def __init__(self, nome=None, disjuntor=None):
+        self.nome = nome or self.nome
+        self.disjuntor = disjuntor or DisjuntorCircuito()
+        self.latencia = HistoricoLatencia()
+
+    def buscar(self, consulta, max_resultados, timeout):
+        raise NotImplementedError
+
+class MotorBusca(ProvedorBusca):
+    """Provedor a partir de uma função funcao(consulta, max_resultados, timeout)"""
+
+    def __init__(self, nome, funcao, disjuntor=None):
+        super().__init__(nome, disjuntor)
+        self.funcao = funcao
+
+    def buscar(self, consulta, max_resultados, timeout):
+        return self.funcao(consulta, max_resultados, timeout)
+
+def canonizar_url(url):
+    """Forma canônica para comparar URLs: https, host sem 'www.', sem fragmento,
+    barra final e parâmetros de rastreamento, com a query string ordenada"""
+    partes = urllib.parse.urlsplit(url.strip())
+    esquema = partes.scheme.lower()
+    if esquema == 'http':
+        esquema = 'https'
+    host = partes.netloc.lower().rsplit('@', 1)[-1]
+    if host.startswith('www.'):
+        host = host[len('www.'):]
+    if host.endswith((':80', ':443')):
+        host = host.rsplit(':', 1)[0]
+    parametros = sorted(
+        (chave, valor) for chave, valor in urllib.parse.parse_qsl(partes.query, keep_blank_values=True)
+        if not chave.lower().startswith(PARAMETROS_RASTREAMENTO)
+    )
+    return urllib.parse.urlunsplit((
+        esquema, host, partes.path.rstrip('/') or '/', urllib.parse.urlencode(parametros), ''
+    ))
+
+def fundir_por_rrf(respostas, limite, k=RRF_K):
+    """Fundir as listas {provedor: resultados} por reciprocal rank fusion.
+    
+    Resultados com a mesma URL canônica viram um só, que soma a pontuação de cada
+    provedor e registra em 'motores' os provedores que o retornaram.
+    """
+    pontuacoes = {}
+    fundidos = {}
+    for nome, resultados in respostas.items():
+        for posicao, resultado in enumerate(resultados, start=1):
+            href = resultado.get('href', '')
+            chave = canonizar_url(href) if href else f'{nome}#{posicao}'
+            pontuacoes[chave] = pontuacoes.get(chave, 0.0) + 1.0 / (k + posicao)
+            # De um ProvedorEscalonado, o resultado traz o motor que de fato respondeu
+            motor = resultado.get('motor', nome)
+            if chave not in fundidos:
+                fundidos[chave] = {campo: valor for campo, valor in resultado.items() if campo != 'motor'}
+                fundidos[chave]['motores'] = [motor]
+            elif motor not in fundidos[chave]['motores']:
+                fundidos[chave]['motores'].append(motor)
+    # sorted é estável: empates ficam na ordem dos provedores
+    ordem = sorted(pontuacoes, key=lambda chave: -pontuacoes[chave])
+    return [fundidos[chave] for chave in ordem[:limite]]
+
+class DespachanteBusca:
+    def __init__(self, provedores, prazo=PRAZO_BUSCA_SEGUNDOS, max_threads=8):
+        self.provedores = list(provedores)
+        self.prazo = prazo
+        # Chamadas abandonadas no fim do prazo terminam sozinhas (cada uma recebeu seu timeout)
+        self._executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="despacho-busca")
+
+    def _chamar(self, motor, consulta, max_resultados, fim):
+        """Registra o resultado no disjuntor aqui, e não em buscar(): uma chamada que perdeu
+        a corrida ou passou do prazo também precisa ser contada quando terminar.
+        
+        fim é o prazo absoluto (time.monotonic()); o timeout do motor é o que resta dele
+        quando a chamada de fato começa, e não quando foi submetida ao executor.
+        """
+        inicio = time.monotonic()
+        if fim - inicio <= 0:
+            motor.disjuntor.liberar_teste()  # Não conta como falha do motor
+            raise TimeoutError('prazo esgotado na fila')
+        try:
+            resultados = motor.buscar(consulta, max_resultados, fim - inicio)
+        except Exception:
+            motor.disjuntor.registrar_falha()
+            raise
+        motor.disjuntor.registrar_sucesso()
+        motor.latencia.registrar(time.monotonic() - inicio)
+        return resultados
+
+    @staticmethod
+    def _cancelar(pendentes):
+        """Cancelar as chamadas que ainda esperam na fila do executor; as que já começaram terminam"""
+        for futuro, motor in pendentes.items():
+            if futuro.cancel():
+                motor.disjuntor.liberar_teste()
+
+    def buscar(self, consulta, max_resultados, prazo=None):
+        """Retorna {'motor', 'resultados', 'erros'}; motor é None se nenhum respondeu a tempo"""
+        fim = time.monotonic() + (self.prazo if prazo is None else prazo)
+        fila = list(self.provedores)
+        erros = {}
+        pendentes = {}  # futuro -> motor
+        proximo_disparo = 0.0  # Instante em que o próximo motor da fila é disparado
+
+        while True:
+            agora = time.monotonic()
+            if agora >= fim:
+                break
+            if fila and (not pendentes or agora >= proximo_disparo):
+                motor = fila.pop(0)
+                # Consultado só na hora do disparo: no meio-aberto, permite() reserva a chamada de teste
+                if not motor.disjuntor.permite():
+                    erros[motor.nome] = 'disjuntor aberto'
+                    continue
+                futuro = self._executor.submit(self._chamar, motor, consulta, max_resultados, fim)
+                pendentes[futuro] = motor
+                proximo_disparo = agora + motor.latencia.p95()
+                continue
+            if not pendentes:
+                break
+
+            espera = fim - agora
+            if fila:
+                espera = min(espera, max(0.0, proximo_disparo - agora))
+            concluidos, _ = wait(pendentes, timeout=espera, return_when=FIRST_COMPLETED)
+            for futuro in concluidos:
+                motor = pendentes.pop(futuro)
+                try:
+                    resultados = futuro.result()
+                except Exception as e:
+                    erros[motor.nome] = str(e) or type(e).__name__
+                    continue
+                self._cancelar(pendentes)
+                return {'motor': motor.nome, 'resultados': resultados, 'erros': erros}
+
+        self._cancelar(pendentes)
+        for motor in pendentes.values():
+            erros[motor.nome] = 'prazo esgotado'
+        return {'motor': None, 'resultados': [], 'erros': erros}
+
+    def buscar_em_todos(self, consulta, max_resultados, prazo=None):
+        """Consultar todos os provedores ao mesmo tempo e fundir o que chegar até o prazo.
+        
+        Retorna {'resultados', 'erros', 'web_respondeu'}; cada resultado traz a lista
+        'motores', e web_respondeu indica se algum provedor não local respondeu a tempo.
+        """
+        fim = time.monotonic() + (self.prazo if prazo is None else prazo)
+        erros = {}
+        pendentes = {}  # futuro -> provedor
+        for provedor in self.provedores:
+            if not provedor.disjuntor.permite():
+                erros[provedor.nome] = 'disjuntor aberto'
+                continue
+            futuro = self._executor.submit(self._chamar, provedor, consulta, max_resultados, fim)
+            pendentes[futuro] = provedor
+
+        concluidos, _ = wait(pendentes, timeout=max(0.0, fim - time.monotonic()))
+        self._cancelar(pendentes)
+        respostas = {}
+        web_respondeu = False
+        for futuro, provedor in pendentes.items():  # Na ordem dos provedores, para a fusão
+            if futuro not in concluidos:
+                erros[provedor.nome] = 'prazo esgotado'
+                continue
+            try:
+                respostas[provedor.nome] = futuro.result()
+            except Exception as e:
+                erros[provedor.nome] = str(e) or type(e).__name__
+                continue
+            web_respondeu = web_respondeu or not provedor.local
+        return {'resultados': fundir_por_rrf(respostas, max_resultados), 'erros': erros, 'web_respondeu': web_respondeu}
+
+    def obter_estado(self):
+        """Estado de cada motor, para exibição: (nome, estado do disjuntor, p95 em segundos);
+        os membros de um ProvedorEscalonado vêm logo depois dele, como 'grupo › membro'"""
+        estado = []
+        for motor in self.provedores:
+            estado.append((motor.nome, motor.disjuntor.estado, motor.latencia.p95()))
+            if isinstance(motor, ProvedorEscalonado):
+                estado.extend((f'{motor.nome} › {nome}', disjuntor, p95) for nome, disjuntor, p95 in motor.despachante.obter_estado())
+        return estado
+
+class ProvedorEscalonado(ProvedorBusca):
+    """Provedores equivalentes (o mesmo índice por caminhos diferentes) vistos como um só.
+    
+    São consultados por DespachanteBusca.buscar(): em ordem, com hedging, e vale a
+    primeira resposta. Cada resultado traz em 'motor' o membro que respondeu.
+    """
+
+    def __init__(self, nome, provedores, disjuntor=None):
+        super().__init__(nome, disjuntor)
+        # Executor próprio: os membros não disputam threads com o grupo que os chama
+        self.despachante = DespachanteBusca(provedores, max_threads=len(provedores))
+
+    def buscar(self, consulta, max_resultados, timeout):
+        resposta = self.despachante.buscar(consulta, max_resultados, prazo=timeout)
+        if resposta['motor'] is None:
+            raise RuntimeError('; '.join(f'{nome}: {erro}' for nome, erro in resposta['erros'].items()) or 'sem provedores')
+        return [dict(resultado, motor=resposta['motor']) for resultado in resposta['resultados']]
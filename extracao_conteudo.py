@@ -0,0 +1,198 @@
+# Extração do conteúdo principal de páginas HTML, sem dependência do Streamlit.
+#
+# O HTML é percorrido uma única vez, como fluxo de eventos (início de tag, texto,
+# fim de tag), sem montar a árvore. Cada bloco (div, article, p...) pontua os
+# blocos que o contêm pelo texto que não está em links, como no Readability; o
+# bloco com maior pontuação é o conteúdo principal. Usa o parser do lxml se
+# estiver instalado e o html.parser da biblioteca padrão caso contrário.
+import re
+from html.parser import HTMLParser
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+TAMANHO_MAXIMO_CONTEUDO = 1500
+# Incrementar quando a saída da extração mudar: invalida as páginas guardadas em cache
+VERSAO_EXTRATOR = 2
+TEXTO_MINIMO_PARAGRAFO = 25  # Blocos com menos texto próprio não pontuam
+NIVEIS_PONTUADOS = 5  # Quantos blocos acima de um parágrafo recebem pontos dele
+
+TAGS_BLOCO = frozenset({
+    'address', 'article', 'blockquote', 'body', 'center', 'dd', 'div', 'dl', 'dt',
+    'figcaption', 'figure', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li', 'main', 'ol',
+    'p', 'pre', 'section', 'table', 'tbody', 'td', 'th', 'tr', 'ul',
+})
+TAGS_IGNORADAS = frozenset({
+    'aside', 'button', 'footer', 'header', 'iframe', 'nav', 'noscript',
+    'script', 'select', 'style', 'svg', 'template', 'textarea',
+})
+TAGS_QUEBRA = frozenset({'br', 'hr', 'img'})
+# Tags que o html.parser não fecha sozinho quando outra igual começa
+TAGS_FECHAMENTO_IMPLICITO = frozenset({'p', 'li', 'dt', 'dd', 'td', 'th', 'tr'})
+BONUS_TAGS = {'article': 1.5, 'main': 1.5}
+CLASSES_POSITIVAS = re.compile(r'article|body|content|entry|main|post|story|text', re.IGNORECASE)
+CLASSES_NEGATIVAS = re.compile(
+    r'ad-|advert|banner|comment|cookie|footer|menu|modal|nav|popup|related|share|sidebar|social|widget',
+    re.IGNORECASE
+)
+
+def parser_padrao():
+    return 'lxml' if etree is not None else 'html.parser'
+
+def versao_extrator():
+    """Identifica a saída da extração: versão do código e parser em uso"""
+    return f'{VERSAO_EXTRATOR}-{parser_padrao()}'
+
+class _Bloco:
+    __slots__ = ('tag', 'peso', 'inicio', 'caracteres', 'caracteres_links', 'texto_proprio', 'links_proprios', 'pontuacao')
+
+    def __init__(self, tag, peso, inicio, caracteres, caracteres_links):
+        self.tag = tag
+        self.peso = peso
+        self.inicio = inicio  # Índice do primeiro fragmento de texto do bloco
+        self.caracteres = caracteres  # Contadores globais na abertura (o total do bloco é a diferença)
+        self.caracteres_links = caracteres_links
+        self.texto_proprio = 0  # Texto fora de blocos filhos
+        self.links_proprios = 0
+        self.pontuacao = 0.0
+
+class _AnalisadorConteudo:
+    """Recebe os eventos do parser (interface de target do lxml) e pontua os blocos"""
+
+    def __init__(self):
+        self.fragmentos = []
+        self.pilha = []
+        self.caracteres = 0
+        self.caracteres_links = 0
+        self.profundidade_ignorada = 0
+        self.profundidade_links = 0
+        self.no_titulo = False
+        self.titulo = []
+        self.melhor = None  # (pontuacao, inicio, fim)
+
+    def _peso(self, tag, atributos):
+        peso = BONUS_TAGS.get(tag, 1.0)
+        classes = f"{atributos.get('class') or ''} {atributos.get('id') or ''}"
+        if classes.strip():
+            if CLASSES_NEGATIVAS.search(classes):
+                peso *= 0.2
+            elif CLASSES_POSITIVAS.search(classes):
+                peso *= 1.25
+        return peso
+
+    def start(self, tag, atributos):
+        tag = tag.lower()
+        if self.profundidade_ignorada or tag in TAGS_IGNORADAS:
+            self.profundidade_ignorada += tag in TAGS_IGNORADAS
+            return
+        if tag == 'title':
+            self.no_titulo = True
+        elif tag == 'a':
+            self.profundidade_links += 1
+        elif tag in TAGS_QUEBRA:
+            self.fragmentos.append(' ')
+        elif tag in TAGS_BLOCO:
+            if tag in TAGS_FECHAMENTO_IMPLICITO and self.pilha and self.pilha[-1].tag == tag:
+                self._fechar_bloco()
+            self.fragmentos.append(' ')
+            self.pilha.append(_Bloco(
+                tag, self._peso(tag, atributos), len(self.fragmentos), self.caracteres, self.caracteres_links
+            ))
+
+    def end(self, tag):
+        tag = tag.lower()
+        if self.profundidade_ignorada:
+            self.profundidade_ignorada -= tag in TAGS_IGNORADAS
+            return
+        if tag == 'title':
+            self.no_titulo = False
+        elif tag == 'a':
+            self.profundidade_links = max(0, self.profundidade_links - 1)
+        elif tag in TAGS_BLOCO and any(bloco.tag == tag for bloco in self.pilha):
+            # Fecha também os blocos que ficaram abertos dentro dele (HTML malformado)
+            while self._fechar_bloco() != tag:
+                pass
+
+    def data(self, texto):
+        if self.profundidade_ignorada:
+            return
+        if self.no_titulo:
+            self.titulo.append(texto)
+            return
+        self.fragmentos.append(texto)
+        tamanho = len(texto.strip())
+        self.caracteres += tamanho
+        if self.profundidade_links:
+            self.caracteres_links += tamanho
+        if self.pilha:
+            self.pilha[-1].texto_proprio += tamanho
+            if self.profundidade_links:
+                self.pilha[-1].links_proprios += tamanho
+
+    def _fechar_bloco(self):
+        bloco = self.pilha.pop()
+        self.fragmentos.append(' ')
+        # Um "parágrafo" pontua a si mesmo e os blocos acima dele, cada vez menos (divisores
+        # 1, 2, 6, 9, 12, como no Readability); em empate vence o bloco fechado primeiro
+        if bloco.texto_proprio >= TEXTO_MINIMO_PARAGRAFO:
+            contribuicao = bloco.texto_proprio - bloco.links_proprios
+            bloco.pontuacao += contribuicao
+            for nivel, ancestral in enumerate(reversed(self.pilha[-NIVEIS_PONTUADOS:])):
+                ancestral.pontuacao += contribuicao / (nivel + 1 if nivel < 2 else nivel * 3)
+        if bloco.pontuacao:
+            total = self.caracteres - bloco.caracteres
+            links = self.caracteres_links - bloco.caracteres_links
+            densidade_links = links / total if total else 1.0
+            pontuacao = bloco.pontuacao * bloco.peso * (1 - densidade_links)
+            if self.melhor is None or pontuacao > self.melhor[0]:
+                self.melhor = (pontuacao, bloco.inicio, len(self.fragmentos))
+        return bloco.tag
+
+    def close(self):
+        while self.pilha:
+            self._fechar_bloco()
+        titulo = ' '.join(''.join(self.titulo).split()) or "Sem título"
+        inicio, fim = (self.melhor[1], self.melhor[2]) if self.melhor else (0, len(self.fragmentos))
+        return titulo, ' '.join(''.join(self.fragmentos[inicio:fim]).split())
+
+class _ParserBiblioteca(HTMLParser):
+    """Adapta o html.parser da biblioteca padrão à interface de target do lxml"""
+
+    def __init__(self, alvo):
+        super().__init__(convert_charrefs=True)
+        self.alvo = alvo
+
+    def handle_starttag(self, tag, atributos):
+        self.alvo.start(tag, dict(atributos))
+
+    def handle_startendtag(self, tag, atributos):
+        self.alvo.start(tag, dict(atributos))
+        if tag not in TAGS_QUEBRA:
+            self.alvo.end(tag)
+
+    def handle_endtag(self, tag):
+        self.alvo.end(tag)
+
+    def handle_data(self, dados):
+        self.alvo.data(dados)
+
+def extrair_conteudo(html, limite=TAMANHO_MAXIMO_CONTEUDO, parser=None):
+    """Retorna (titulo, conteudo) do HTML (texto), com o conteúdo limitado a `limite` caracteres"""
+    parser = parser or parser_padrao()
+    if not html.strip():
+        return "Sem título", ""
+    alvo = _AnalisadorConteudo()
+    if parser == 'lxml':
+        analisador = etree.HTMLParser(target=alvo)
+        analisador.feed(html)
+        titulo, conteudo = analisador.close()
+    else:
+        analisador = _ParserBiblioteca(alvo)
+        analisador.feed(html)
+        analisador.close()
+        titulo, conteudo = alvo.close()
+    if len(conteudo) > limite:
+        conteudo = conteudo[:limite] + '...'
+    return titulo, conteudo
@@ -0,0 +1,141 @@
+# Extração de texto de documentos (PDF, Word e texto), sem dependência do Streamlit.
+# As funções deste módulo também rodam nos processos da fila de extração
+# (ProcessPoolExecutor), por isso precisam ficar num módulo importável.
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import PyPDF2
+from docx import Document
+
+# PyMuPDF é bem mais rápido que o PyPDF2; se não estiver instalado, usamos o PyPDF2
+try:
+    import pymupdf
+except ImportError:
+    try:
+        import fitz as pymupdf
+    except ImportError:
+        pymupdf = None
+
+TIPOS_SUPORTADOS = ['pdf', 'docx', 'doc', 'txt']
+# Incrementar quando a saída da extração mudar: invalida os textos guardados em cache
+VERSAO_EXTRATOR = 1
+PAGINAS_MINIMAS_POR_PARTE = 16  # Abaixo disso, dividir o PDF entre processos não compensa
+
+def tipo_do_arquivo(nome_arquivo):
+    return nome_arquivo.split('.')[-1].lower()
+
+def motor_pdf():
+    return 'pymupdf' if pymupdf is not None else 'pypdf2'
+
+def versao_extrator():
+    """Identifica a saída da extração: versão do código e motor de PDF em uso"""
+    return f'{VERSAO_EXTRATOR}-{motor_pdf()}'
+
+@contextmanager
+def _abrir_origem(origem):
+    """origem pode ser um caminho local, bytes ou um objeto de arquivo binário"""
+    if isinstance(origem, (bytes, bytearray)):
+        yield io.BytesIO(origem)
+    elif isinstance(origem, (str, os.PathLike)):
+        with open(origem, 'rb') as arquivo:
+            yield arquivo
+    else:
+        origem.seek(0)
+        yield origem
+
+def _abrir_pdf_pymupdf(origem):
+    if isinstance(origem, (str, os.PathLike)):
+        return pymupdf.open(origem, filetype='pdf')
+    if not isinstance(origem, (bytes, bytearray)):
+        origem.seek(0)
+        origem = origem.read()
+    return pymupdf.open(stream=origem, filetype='pdf')
+
+def contar_paginas_pdf(origem, motor=None):
+    if (motor or motor_pdf()) == 'pymupdf':
+        with _abrir_pdf_pymupdf(origem) as documento:
+            return documento.page_count
+    with _abrir_origem(origem) as arquivo:
+        return len(PyPDF2.PdfReader(arquivo).pages)
+
+def extrair_paginas_pdf(origem, inicio=0, fim=None, motor=None):
+    """Extrair o texto das páginas [inicio, fim) de um PDF, uma linha em branco entre páginas"""
+    partes = []
+    if (motor or motor_pdf()) == 'pymupdf':
+        with _abrir_pdf_pymupdf(origem) as documento:
+            for numero in range(inicio, documento.page_count if fim is None else fim):
+                texto_pagina = documento[numero].get_text()
+                if texto_pagina:
+                    partes.append(texto_pagina)
+    else:
+        with _abrir_origem(origem) as arquivo:
+            pdf_reader = PyPDF2.PdfReader(arquivo)
+            for pagina in pdf_reader.pages[inicio:fim]:
+                texto_pagina = pagina.extract_text()
+                if texto_pagina:
+                    partes.append(texto_pagina)
+    # Um único join em vez de concatenar a cada página (custo linear no tamanho do texto)
+    return "".join(parte + "\n" for parte in partes)
+
+def dividir_paginas(total_paginas, partes, minimo=PAGINAS_MINIMAS_POR_PARTE):
+    """Dividir [0, total_paginas) em até `partes` intervalos contíguos de pelo menos `minimo` páginas"""
+    partes = max(1, min(partes, total_paginas // minimo))
+    tamanho, resto = divmod(total_paginas, partes)
+    intervalos = []
+    inicio = 0
+    for indice in range(partes):
+        fim = inicio + tamanho + (1 if indice < resto else 0)
+        intervalos.append((inicio, fim))
+        inicio = fim
+    return intervalos
+
+def extrair_texto_pdf_paralelo(origem, processos=None, executor=None, motor=None):
+    """Extrair o texto de um PDF dividindo as páginas entre processos.
+
+    origem deve ser um caminho ou bytes (é enviada a cada processo). Usa o
+    executor informado ou cria um pool temporário com `processos` processos.
+    """
+    motor = motor or motor_pdf()
+    processos = processos or os.cpu_count() or 1
+    intervalos = dividir_paginas(contar_paginas_pdf(origem, motor), processos)
+    if len(intervalos) == 1:
+        return extrair_paginas_pdf(origem, motor=motor)
+
+    if executor is None:
+        with ProcessPoolExecutor(max_workers=min(processos, len(intervalos))) as executor_local:
+            return extrair_texto_pdf_paralelo(origem, processos, executor_local, motor)
+
+    futuros = [executor.submit(extrair_paginas_pdf, origem, inicio, fim, motor) for inicio, fim in intervalos]
+    return "".join(futuro.result() for futuro in futuros)
+
+def extrair_texto_pdf(arquivo):
+    """Extrair texto de arquivo PDF"""
+    return extrair_paginas_pdf(arquivo)
+
+def extrair_texto_word(arquivo):
+    """Extrair texto de documento Word"""
+    arquivo.seek(0)
+    doc = Document(arquivo)
+    return "".join(paragrafo.text + "\n" for paragrafo in doc.paragraphs if paragrafo.text)
+
+def extrair_texto(arquivo, nome_arquivo):
+    """Extrair o texto de um arquivo pela extensão do nome; None se o tipo não é suportado"""
+    tipo_arquivo = tipo_do_arquivo(nome_arquivo)
+
+    if tipo_arquivo == 'pdf':
+        return extrair_texto_pdf(arquivo)
+    elif tipo_arquivo in ['docx', 'doc']:
+        return extrair_texto_word(arquivo)
+    elif tipo_arquivo == 'txt':
+        return arquivo.read().decode('utf-8', errors='replace')
+    else:
+        return None
+
+def extrair_texto_de_origem(origem, nome_arquivo):
+    """Ponto de entrada dos processos trabalhadores: origem é um caminho local ou os bytes do arquivo"""
+    if isinstance(origem, (bytes, bytearray)):
+        return extrair_texto(io.BytesIO(origem), nome_arquivo)
+    with open(origem, 'rb') as arquivo:
+        return extrair_texto(arquivo, nome_arquivo)
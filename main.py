@@ -6,7 +6,6 @@ from datetime import datetime, timedelta
 import hashlib
 import sqlite3
 from pathlib import Path
-import requests
 from bs4 import BeautifulSoup
 import re
 import time
@@ -14,18 +13,214 @@ import io
 import base64
 
 # Novos imports para funcionalidades avançadas
-from docx import Document
-import PyPDF2
-import fitz  # PyMuPDF - biblioteca alternativa para PDF
 from duckduckgo_search import DDGS
 #import google.generativeai as genai
+import extracao_texto
+import extracao_conteudo
+import cliente_http
+import despacho_busca
+import urllib.parse
 import os
+import multiprocessing
+import tempfile
+import threading
+import queue
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, CancelledError, as_completed, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
 
-# Inicializar banco de dados com tabelas aprimoradas
-def init_db():
-    conn = sqlite3.connect('sistema_suporte.db')
-    c = conn.cursor()
+# Configuração do banco de dados (caminho pode ser definido por variável de ambiente)
+CAMINHO_BD = os.environ.get('SISTEMA_SUPORTE_DB', 'sistema_suporte.db')
+TIMEOUT_BD_SEGUNDOS = 10
+TAMANHO_CACHE_STATEMENTS = 256
+
+# Pool de conexões do processo: o Streamlit executa cada rerun numa thread nova,
+# então a conexão é emprestada a cada uso e devolvida ao pool no fim
+TAMANHO_POOL_CONEXOES = int(os.environ.get('SISTEMA_SUPORTE_POOL_CONEXOES', 8))
+_emprestimos_thread = threading.local()  # Conexão emprestada à thread, para chamadas aninhadas
+
+def configurar_banco(caminho):
+    """Definir o caminho do banco de dados usado pelas próximas conexões"""
+    global CAMINHO_BD
+    CAMINHO_BD = caminho
+
+def abrir_conexao(caminho=None):
+    """Abrir uma nova conexão SQLite configurada (WAL, busy timeout e cache de statements).
+    
+    check_same_thread=False: a conexão passa de thread em thread pelo pool, mas só
+    uma a usa por vez.
+    """
+    conn = sqlite3.connect(
+        caminho or CAMINHO_BD,
+        timeout=TIMEOUT_BD_SEGUNDOS,
+        cached_statements=TAMANHO_CACHE_STATEMENTS,
+        check_same_thread=False
+    )
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute(f'PRAGMA busy_timeout = {TIMEOUT_BD_SEGUNDOS * 1000}')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+class PoolConexoes:
+    """Até `tamanho` conexões com um banco, abertas sob demanda e reaproveitadas"""
+    
+    def __init__(self, caminho, tamanho=TAMANHO_POOL_CONEXOES):
+        self.caminho = caminho
+        self.tamanho = tamanho
+        self.abertas = 0
+        self._livres = queue.Queue()
+        self._trava = threading.Lock()
+    
+    def emprestar(self):
+        try:
+            return self._livres.get_nowait()
+        except queue.Empty:
+            pass
+        with self._trava:
+            if self.abertas < self.tamanho:
+                self.abertas += 1
+                abrir = True
+            else:
+                abrir = False
+        if abrir:
+            try:
+                return abrir_conexao(self.caminho)
+            except BaseException:
+                with self._trava:
+                    self.abertas -= 1
+                raise
+        try:
+            return self._livres.get(timeout=TIMEOUT_BD_SEGUNDOS)
+        except queue.Empty:
+            raise sqlite3.OperationalError(f"Nenhuma conexão livre no pool após {TIMEOUT_BD_SEGUNDOS} s") from None
+    
+    def devolver(self, conn):
+        if conn.in_transaction:
+            # Descartar transação deixada aberta por uma chamada que falhou
+            conn.rollback()
+        self._livres.put(conn)
+
+@st.cache_resource(show_spinner=False)
+def obter_pool_conexoes(caminho_bd):
+    """Um pool por processo e caminho do banco, compartilhado pelas sessões"""
+    return PoolConexoes(caminho_bd)
+
+@contextmanager
+def obter_conexao():
+    """Emprestar uma conexão do pool durante o bloco `with`.
+    
+    Chamadas aninhadas na mesma thread recebem a mesma conexão (e a mesma transação).
+    """
+    conn = getattr(_emprestimos_thread, 'conn', None)
+    if conn is not None:
+        yield conn
+        return
+    pool = obter_pool_conexoes(CAMINHO_BD)
+    conn = _emprestimos_thread.conn = pool.emprestar()
+    try:
+        yield conn
+    finally:
+        _emprestimos_thread.conn = None
+        pool.devolver(conn)
+
+# Armazenamento de anexos endereçado por conteúdo (SHA-256), fora do SQLite
+DIRETORIO_ANEXOS = os.environ.get('SISTEMA_SUPORTE_ANEXOS', 'anexos')
+TAMANHO_BLOCO_ANEXOS = 1024 * 1024  # Leituras e gravações de anexos em blocos de 1 MB
+
+class ArmazenamentoAnexos:
+    """Interface dos armazenamentos de anexos: o conteúdo é identificado pelo seu hash SHA-256.
+    
+    A gravação tem duas etapas: receber() copia o fluxo em blocos para uma área
+    temporária e calcula o hash; confirmar() publica o conteúdo sob esse hash.
+    """
+    
+    def receber(self, origem):
+        """Retorna (hash_arquivo, tamanho, temporario)"""
+        raise NotImplementedError
+    
+    def confirmar(self, hash_arquivo, temporario):
+        raise NotImplementedError
+    
+    def descartar(self, temporario):
+        raise NotImplementedError
     
+    def abrir(self, hash_arquivo):
+        """Retorna um objeto de arquivo binário para leitura em blocos"""
+        raise NotImplementedError
+    
+    def caminho_local(self, hash_arquivo):
+        """Caminho do conteúdo no sistema de arquivos local, ou None se não houver"""
+        return None
+    
+    def existe(self, hash_arquivo):
+        raise NotImplementedError
+    
+    def remover(self, hash_arquivo):
+        raise NotImplementedError
+
+class ArmazenamentoAnexosDisco(ArmazenamentoAnexos):
+    """Arquivos gravados em <diretorio>/<2 primeiros caracteres do hash>/<hash>"""
+    
+    def __init__(self, diretorio):
+        self.diretorio = Path(diretorio)
+    
+    def caminho(self, hash_arquivo):
+        return self.diretorio / hash_arquivo[:2] / hash_arquivo
+    
+    def receber(self, origem):
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        hash_sha256 = hashlib.sha256()
+        tamanho = 0
+        # O arquivo temporário nunca é visto como conteúdo publicado
+        with tempfile.NamedTemporaryFile(dir=self.diretorio, suffix='.tmp', delete=False) as destino:
+            for bloco in iter(lambda: origem.read(TAMANHO_BLOCO_ANEXOS), b''):
+                hash_sha256.update(bloco)
+                destino.write(bloco)
+                tamanho += len(bloco)
+        return hash_sha256.hexdigest(), tamanho, destino.name
+    
+    def confirmar(self, hash_arquivo, temporario):
+        destino = self.caminho(hash_arquivo)
+        if destino.exists():
+            # Conteúdo idêntico já armazenado (deduplicação)
+            self.descartar(temporario)
+            return
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(temporario, destino)
+    
+    def descartar(self, temporario):
+        try:
+            os.unlink(temporario)
+        except FileNotFoundError:
+            pass
+    
+    def abrir(self, hash_arquivo):
+        return open(self.caminho(hash_arquivo), 'rb')
+    
+    def caminho_local(self, hash_arquivo):
+        return self.caminho(hash_arquivo)
+    
+    def existe(self, hash_arquivo):
+        return self.caminho(hash_arquivo).exists()
+    
+    def remover(self, hash_arquivo):
+        try:
+            self.caminho(hash_arquivo).unlink()
+        except FileNotFoundError:
+            pass
+
+_armazenamento_anexos = ArmazenamentoAnexosDisco(DIRETORIO_ANEXOS)
+
+def configurar_armazenamento_anexos(armazenamento):
+    """Substituir o armazenamento de anexos (por exemplo, por outro diretório ou serviço)"""
+    global _armazenamento_anexos
+    _armazenamento_anexos = armazenamento
+
+def obter_armazenamento_anexos():
+    return _armazenamento_anexos
+
+# Migração 1: tabelas iniciais (bancos criados antes do controle de versão já as possuem)
+def _migracao_tabelas_iniciais(c):
     # Tabela de usuários
     c.execute('''
         CREATE TABLE IF NOT EXISTS usuarios (
@@ -115,9 +310,448 @@ def init_db():
             FOREIGN KEY (problema_id) REFERENCES problemas (id)
         )
     ''')
+
+# Migração 2: índices secundários e atribuições únicas por (problema, usuário)
+def _migracao_indices(c):
+    # Remover atribuições duplicadas antes de criar o índice único
+    c.execute('''
+        DELETE FROM atribuicoes
+        WHERE id NOT IN (
+            SELECT MIN(id) FROM atribuicoes GROUP BY problema_id, usuario_id
+        )
+    ''')
+    c.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_atribuicoes_problema_usuario
+        ON atribuicoes (problema_id, usuario_id)
+    ''')
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_problemas_submetido_criado
+        ON problemas (submetido_por, criado_em)
+    ''')
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_problemas_status_prioridade
+        ON problemas (status, prioridade)
+    ''')
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_anexos_problema
+        ON anexos_arquivos (problema_id)
+    ''')
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_resultados_problema_buscado
+        ON resultados_busca (problema_id, buscado_em)
+    ''')
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_eventos_data
+        ON eventos_calendario (data_evento)
+    ''')
+
+# Migração 3: índice para a paginação por cursor de todos os tickets
+def _migracao_indice_paginacao(c):
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_problemas_criado
+        ON problemas (criado_em)
+    ''')
+
+# Estatísticas materializadas: contagens por (dimensão, valor) mantidas por triggers
+DIMENSOES_ESTATISTICAS = ['status', 'prioridade', 'categoria', 'submetido_por', 'atribuido_para']
+
+def _sql_incrementar_estatistica(dimensao, valor, delta):
+    return f'''
+            INSERT INTO estatisticas_tickets (dimensao, valor, contagem)
+            SELECT '{dimensao}', {valor}, {delta} WHERE {valor} IS NOT NULL
+            ON CONFLICT (dimensao, valor) DO UPDATE SET contagem = contagem + ({delta});'''
+
+def _sql_estatisticas_problema(registro, delta):
+    comandos = [_sql_incrementar_estatistica('total', "''", delta)]
+    for dimensao in DIMENSOES_ESTATISTICAS:
+        comandos.append(_sql_incrementar_estatistica(dimensao, f'{registro}.{dimensao}', delta))
+    return ''.join(comandos)
+
+def _popular_estatisticas(c):
+    c.execute('DELETE FROM estatisticas_tickets')
+    c.execute('''
+        INSERT INTO estatisticas_tickets (dimensao, valor, contagem)
+        SELECT 'total', '', COUNT(*) FROM problemas
+    ''')
+    for dimensao in DIMENSOES_ESTATISTICAS:
+        c.execute(f'''
+            INSERT INTO estatisticas_tickets (dimensao, valor, contagem)
+            SELECT '{dimensao}', {dimensao}, COUNT(*) FROM problemas
+            WHERE {dimensao} IS NOT NULL
+            GROUP BY {dimensao}
+        ''')
+
+def compactar_banco():
+    """Executar VACUUM para devolver ao sistema o espaço liberado (por exemplo, BLOBs movidos)"""
+    with obter_conexao() as conn:
+        conn.execute('VACUUM')
+
+def reconstruir_estatisticas():
+    """Recalcular estatisticas_tickets a partir das tabelas de origem (corrige divergências)"""
+    with obter_conexao() as conn:
+        _popular_estatisticas(conn.cursor())
+        conn.commit()
+
+# Migração 4: tabela de estatísticas materializadas e triggers que a mantêm
+def _migracao_estatisticas(c):
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS estatisticas_tickets (
+            dimensao TEXT NOT NULL,
+            valor TEXT NOT NULL,
+            contagem INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (dimensao, valor)
+        ) WITHOUT ROWID
+    ''')
+    
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_problemas_estatisticas_insert
+        AFTER INSERT ON problemas
+        BEGIN{_sql_estatisticas_problema('NEW', 1)}
+        END
+    ''')
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_problemas_estatisticas_delete
+        AFTER DELETE ON problemas
+        BEGIN{_sql_estatisticas_problema('OLD', -1)}
+        END
+    ''')
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_problemas_estatisticas_update
+        AFTER UPDATE OF {', '.join(DIMENSOES_ESTATISTICAS)} ON problemas
+        BEGIN{_sql_estatisticas_problema('OLD', -1)}{_sql_estatisticas_problema('NEW', 1)}
+        END
+    ''')
+    
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_atribuicoes_estatisticas_insert
+        AFTER INSERT ON atribuicoes
+        BEGIN{_sql_incrementar_estatistica('atribuicoes_usuario', 'NEW.usuario_id', 1)}
+        END
+    ''')
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_atribuicoes_estatisticas_delete
+        AFTER DELETE ON atribuicoes
+        BEGIN{_sql_incrementar_estatistica('atribuicoes_usuario', 'OLD.usuario_id', -1)}
+        END
+    ''')
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_atribuicoes_estatisticas_update
+        AFTER UPDATE OF usuario_id ON atribuicoes
+        BEGIN{_sql_incrementar_estatistica('atribuicoes_usuario', 'OLD.usuario_id', -1)}{_sql_incrementar_estatistica('atribuicoes_usuario', 'NEW.usuario_id', 1)}
+        END
+    ''')
+    
+    # Popular a tabela com os dados já existentes
+    _popular_estatisticas(c)
+
+# Migração 5: tamanho dos anexos guardado em coluna própria (listagem sem ler o BLOB)
+def _migracao_tamanho_anexos(c):
+    c.execute('ALTER TABLE anexos_arquivos ADD COLUMN tamanho_arquivo INTEGER')
+    c.execute('UPDATE anexos_arquivos SET tamanho_arquivo = LENGTH(dados_arquivo)')
+
+# Migração 6: conteúdo dos anexos movido para o armazenamento por hash, com contagem de referências
+def _migracao_armazenamento_anexos(c):
+    c.execute('ALTER TABLE anexos_arquivos ADD COLUMN hash_arquivo TEXT')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS conteudos_anexos (
+            hash_arquivo TEXT PRIMARY KEY,
+            tamanho_arquivo INTEGER,
+            referencias INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_conteudos_anexos_sem_referencias
+        ON conteudos_anexos (referencias) WHERE referencias <= 0
+    ''')
     
-    conn.commit()
-    conn.close()
+    # Triggers mantêm o número de anexos que apontam para cada conteúdo
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_anexos_referencias_insert
+        AFTER INSERT ON anexos_arquivos
+        WHEN NEW.hash_arquivo IS NOT NULL
+        BEGIN
+            INSERT INTO conteudos_anexos (hash_arquivo, tamanho_arquivo, referencias)
+            VALUES (NEW.hash_arquivo, NEW.tamanho_arquivo, 1)
+            ON CONFLICT (hash_arquivo) DO UPDATE SET referencias = referencias + 1;
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_anexos_referencias_delete
+        AFTER DELETE ON anexos_arquivos
+        WHEN OLD.hash_arquivo IS NOT NULL
+        BEGIN
+            UPDATE conteudos_anexos SET referencias = referencias - 1
+            WHERE hash_arquivo = OLD.hash_arquivo;
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_anexos_referencias_update
+        AFTER UPDATE OF hash_arquivo ON anexos_arquivos
+        BEGIN
+            UPDATE conteudos_anexos SET referencias = referencias - 1
+            WHERE hash_arquivo = OLD.hash_arquivo;
+            INSERT INTO conteudos_anexos (hash_arquivo, tamanho_arquivo, referencias)
+            SELECT NEW.hash_arquivo, NEW.tamanho_arquivo, 1 WHERE NEW.hash_arquivo IS NOT NULL
+            ON CONFLICT (hash_arquivo) DO UPDATE SET referencias = referencias + 1;
+        END
+    ''')
+    
+    # Mover os BLOBs existentes, um anexo por vez e em blocos, sem carregá-los na memória
+    armazenamento = obter_armazenamento_anexos()
+    ids_anexos = [linha[0] for linha in c.execute('SELECT id FROM anexos_arquivos').fetchall()]
+    for anexo_id in ids_anexos:
+        with c.connection.blobopen('anexos_arquivos', 'dados_arquivo', anexo_id, readonly=True) as blob:
+            hash_arquivo, _, temporario = armazenamento.receber(blob)
+        armazenamento.confirmar(hash_arquivo, temporario)
+        c.execute('''
+            UPDATE anexos_arquivos SET hash_arquivo = ?, dados_arquivo = X''
+            WHERE id = ?
+        ''', (hash_arquivo, anexo_id))
+
+# Migração 7: índice de busca textual (FTS5) sobre título, descrição e solução dos tickets
+def _migracao_busca_textual(c):
+    c.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS problemas_fts USING fts5(
+            titulo, descricao, solucao,
+            content='problemas', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    ''')
+    
+    # Triggers mantêm o índice sincronizado com a tabela problemas
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_problemas_fts_insert
+        AFTER INSERT ON problemas
+        BEGIN
+            INSERT INTO problemas_fts (rowid, titulo, descricao, solucao)
+            VALUES (NEW.id, NEW.titulo, NEW.descricao, NEW.solucao);
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_problemas_fts_delete
+        AFTER DELETE ON problemas
+        BEGIN
+            INSERT INTO problemas_fts (problemas_fts, rowid, titulo, descricao, solucao)
+            VALUES ('delete', OLD.id, OLD.titulo, OLD.descricao, OLD.solucao);
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_problemas_fts_update
+        AFTER UPDATE OF titulo, descricao, solucao ON problemas
+        BEGIN
+            INSERT INTO problemas_fts (problemas_fts, rowid, titulo, descricao, solucao)
+            VALUES ('delete', OLD.id, OLD.titulo, OLD.descricao, OLD.solucao);
+            INSERT INTO problemas_fts (rowid, titulo, descricao, solucao)
+            VALUES (NEW.id, NEW.titulo, NEW.descricao, NEW.solucao);
+        END
+    ''')
+    
+    # Indexar os tickets já existentes
+    c.execute("INSERT INTO problemas_fts (problemas_fts) VALUES ('rebuild')")
+
+# Migração 8: texto extraído dos anexos (um registro por conteúdo) e seu índice FTS5
+def _migracao_texto_anexos(c):
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS textos_anexos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            hash_arquivo TEXT UNIQUE NOT NULL,
+            texto TEXT NOT NULL,
+            extraido_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    c.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS textos_anexos_fts USING fts5(
+            texto,
+            content='textos_anexos', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_textos_anexos_fts_insert
+        AFTER INSERT ON textos_anexos
+        BEGIN
+            INSERT INTO textos_anexos_fts (rowid, texto) VALUES (NEW.id, NEW.texto);
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_textos_anexos_fts_delete
+        AFTER DELETE ON textos_anexos
+        BEGIN
+            INSERT INTO textos_anexos_fts (textos_anexos_fts, rowid, texto)
+            VALUES ('delete', OLD.id, OLD.texto);
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_textos_anexos_fts_update
+        AFTER UPDATE OF texto ON textos_anexos
+        BEGIN
+            INSERT INTO textos_anexos_fts (textos_anexos_fts, rowid, texto)
+            VALUES ('delete', OLD.id, OLD.texto);
+            INSERT INTO textos_anexos_fts (rowid, texto) VALUES (NEW.id, NEW.texto);
+        END
+    ''')
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_anexos_hash
+        ON anexos_arquivos (hash_arquivo)
+    ''')
+
+# Migração 9: fila persistente de extração de texto dos anexos
+def _migracao_fila_extracao(c):
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS tarefas_extracao (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            anexo_id INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pendente',
+            tentativas INTEGER NOT NULL DEFAULT 0,
+            erro TEXT,
+            criado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            atualizado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            proxima_tentativa_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (anexo_id) REFERENCES anexos_arquivos (id)
+        )
+    ''')
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_tarefas_extracao_status
+        ON tarefas_extracao (status, proxima_tentativa_em)
+    ''')
+    
+    # Agendar os anexos já existentes cujo conteúdo ainda não tem texto extraído
+    c.execute('''
+        INSERT INTO tarefas_extracao (anexo_id)
+        SELECT a.id FROM anexos_arquivos a
+        WHERE a.hash_arquivo IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM textos_anexos t WHERE t.hash_arquivo = a.hash_arquivo)
+    ''')
+
+# Migração 10: cache de textos extraídos, por conteúdo e versão do extrator
+def _migracao_cache_extracao(c):
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS cache_extracao (
+            hash_arquivo TEXT NOT NULL,
+            versao_extrator TEXT NOT NULL,
+            texto TEXT NOT NULL,
+            tamanho INTEGER NOT NULL,
+            acessado_em REAL NOT NULL,
+            PRIMARY KEY (hash_arquivo, versao_extrator)
+        )
+    ''')
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_cache_extracao_acesso
+        ON cache_extracao (acessado_em)
+    ''')
+
+# Migração 11: cache das buscas na web e contadores de acertos/falhas dos caches
+def _migracao_cache_buscas(c):
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS cache_buscas (
+            consulta_normalizada TEXT NOT NULL,
+            max_resultados INTEGER NOT NULL,
+            resultados TEXT NOT NULL,
+            criado_em REAL NOT NULL,
+            PRIMARY KEY (consulta_normalizada, max_resultados)
+        )
+    ''')
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_cache_buscas_criado
+        ON cache_buscas (criado_em)
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS contadores_cache (
+            nome TEXT PRIMARY KEY,
+            valor INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+
+# Migração 12: cache das páginas extraídas, com validadores HTTP para GET condicional
+def _migracao_cache_paginas(c):
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS cache_paginas (
+            url TEXT PRIMARY KEY,
+            etag TEXT,
+            ultima_modificacao TEXT,
+            expira_em REAL,
+            titulo TEXT NOT NULL,
+            conteudo TEXT NOT NULL,
+            atualizado_em REAL NOT NULL
+        )
+    ''')
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_cache_paginas_atualizado
+        ON cache_paginas (atualizado_em)
+    ''')
+
+# Migração 13: versão do extrator em cada página do cache; entradas antigas (NULL) viram falhas
+def _migracao_versao_cache_paginas(c):
+    c.execute('ALTER TABLE cache_paginas ADD COLUMN versao_extrator TEXT')
+
+# Migração 14: remover a dimensão atribuicoes_usuario, mantida por triggers mas nunca lida
+# ("Minhas Atribuições" conta atribuido_para)
+def _migracao_remover_atribuicoes_usuario(c):
+    for trigger in ('insert', 'delete', 'update'):
+        c.execute(f'DROP TRIGGER IF EXISTS trg_atribuicoes_estatisticas_{trigger}')
+    c.execute("DELETE FROM estatisticas_tickets WHERE dimensao = 'atribuicoes_usuario'")
+
+# Migração 15: índice na ordem de "Tickets Disponíveis" (prioridade, mais recentes), só com
+# os tickets abertos: a página e o cursor vão direto ao ponto, sem ordenar a tabela
+def _migracao_indice_disponiveis(c):
+    c.execute(f'''
+        CREATE INDEX IF NOT EXISTS idx_problemas_disponiveis
+        ON problemas (({_sql_ordem_prioridade('prioridade')}), criado_em DESC, id DESC)
+        WHERE {_sql_status_disponivel('status')}
+    ''')
+
+# Migrações em ordem; a versão de cada uma é a sua posição (1, 2, ...)
+MIGRACOES = [
+    _migracao_tabelas_iniciais,
+    _migracao_indices,
+    _migracao_indice_paginacao,
+    _migracao_estatisticas,
+    _migracao_tamanho_anexos,
+    _migracao_armazenamento_anexos,
+    _migracao_busca_textual,
+    _migracao_texto_anexos,
+    _migracao_fila_extracao,
+    _migracao_cache_extracao,
+    _migracao_cache_buscas,
+    _migracao_cache_paginas,
+    _migracao_versao_cache_paginas,
+    _migracao_remover_atribuicoes_usuario,
+    _migracao_indice_disponiveis,
+]
+VERSAO_SCHEMA = len(MIGRACOES)
+
+def obter_versao_schema(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def aplicar_migracoes(conn):
+    """Aplicar as migrações pendentes, atualizando PRAGMA user_version a cada passo"""
+    for versao, migracao in enumerate(MIGRACOES, start=1):
+        if obter_versao_schema(conn) >= versao:
+            continue
+        # BEGIN IMMEDIATE serializa processos migrando o mesmo arquivo ao mesmo tempo
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if obter_versao_schema(conn) < versao:
+                migracao(conn.cursor())
+                conn.execute(f'PRAGMA user_version = {versao}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+# Inicializar banco de dados com tabelas aprimoradas
+def init_db():
+    with obter_conexao() as conn:
+        aplicar_migracoes(conn)
+
+# Inicializar o banco uma única vez por processo (e não a cada rerun do Streamlit)
+@st.cache_resource(show_spinner=False)
+def init_db_uma_vez(caminho_bd, versao_schema):
+    """Executar init_db() na primeira chamada para este caminho e versão de schema"""
+    init_db()
+    return versao_schema
 
 # Gerar ID único do ticket
 def gerar_id_ticket():
@@ -132,280 +766,757 @@ def criptografar_senha(senha):
 
 # Autenticar usuário
 def autenticar_usuario(email, senha):
-    conn = sqlite3.connect('sistema_suporte.db')
-    c = conn.cursor()
-    senha_criptografada = criptografar_senha(senha)
-    
-    c.execute('SELECT * FROM usuarios WHERE email = ? AND senha = ?', 
-              (email, senha_criptografada))
-    usuario = c.fetchone()
-    conn.close()
-    
-    if usuario:
-        return {
-            'id': usuario[0],
-            'email': usuario[1],
-            'nome': usuario[3],
-            'perfil': usuario[4]
-        }
-    return None
+    with obter_conexao() as conn:
+        c = conn.cursor()
+        senha_criptografada = criptografar_senha(senha)
+    
+        c.execute('SELECT * FROM usuarios WHERE email = ? AND senha = ?', 
+                  (email, senha_criptografada))
+        usuario = c.fetchone()
+    
+        if usuario:
+            return {
+                'id': usuario[0],
+                'email': usuario[1],
+                'nome': usuario[3],
+                'perfil': usuario[4]
+            }
+        return None
 
 # Registrar novo usuário
 def registrar_usuario(email, senha, nome, perfil='usuario'):
-    conn = sqlite3.connect('sistema_suporte.db')
-    c = conn.cursor()
-    senha_criptografada = criptografar_senha(senha)
+    with obter_conexao() as conn:
+        c = conn.cursor()
+        senha_criptografada = criptografar_senha(senha)
     
-    try:
-        c.execute('INSERT INTO usuarios (email, senha, nome, perfil) VALUES (?, ?, ?, ?)',
-                  (email, senha_criptografada, nome, perfil))
-        conn.commit()
-        conn.close()
-        return True
-    except sqlite3.IntegrityError:
-        conn.close()
-        return False
+        try:
+            c.execute('INSERT INTO usuarios (email, senha, nome, perfil) VALUES (?, ?, ?, ?)',
+                      (email, senha_criptografada, nome, perfil))
+            conn.commit()
+            return True
+        except sqlite3.IntegrityError:
+            conn.rollback()
+            return False
 
 # Submissão de problema aprimorada com ID do ticket
 def submeter_problema(titulo, descricao, categoria, prioridade, submetido_por, dias_prazo=30):
-    conn = sqlite3.connect('sistema_suporte.db')
-    c = conn.cursor()
-    prazo = datetime.now() + timedelta(days=dias_prazo)
-    ticket_id = gerar_id_ticket()
+    with obter_conexao() as conn:
+        c = conn.cursor()
+        prazo = datetime.now() + timedelta(days=dias_prazo)
+        ticket_id = gerar_id_ticket()
     
-    c.execute('''
-        INSERT INTO problemas (ticket_id, titulo, descricao, categoria, prioridade, submetido_por, prazo)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    ''', (ticket_id, titulo, descricao, categoria, prioridade, submetido_por, prazo))
+        c.execute('''
+            INSERT INTO problemas (ticket_id, titulo, descricao, categoria, prioridade, submetido_por, prazo)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (ticket_id, titulo, descricao, categoria, prioridade, submetido_por, prazo))
     
-    problema_id = c.lastrowid
-    conn.commit()
-    conn.close()
-    return problema_id, ticket_id
+        problema_id = c.lastrowid
+        conn.commit()
+        return problema_id, ticket_id
 
 # Obter todos os problemas
 def obter_todos_problemas():
-    conn = sqlite3.connect('sistema_suporte.db')
-    c = conn.cursor()
+    with obter_conexao() as conn:
+        c = conn.cursor()
     
-    c.execute('''
-        SELECT p.*, u.nome as nome_submetido_por, u2.nome as nome_atribuido_para
-        FROM problemas p 
-        LEFT JOIN usuarios u ON p.submetido_por = u.id 
-        LEFT JOIN usuarios u2 ON p.atribuido_para = u2.id
-        ORDER BY p.criado_em DESC
-    ''')
-    problemas = c.fetchall()
-    conn.close()
+        c.execute('''
+            SELECT p.*, u.nome as nome_submetido_por, u2.nome as nome_atribuido_para
+            FROM problemas p 
+            LEFT JOIN usuarios u ON p.submetido_por = u.id 
+            LEFT JOIN usuarios u2 ON p.atribuido_para = u2.id
+            ORDER BY p.criado_em DESC
+        ''')
+        problemas = c.fetchall()
+    
+        return problemas
+
+# Paginação por cursor (keyset): o cursor identifica o último ticket da página anterior
+TAMANHO_PAGINA = 25
+
+_SELECT_PROBLEMAS_PAGINA = '''
+    SELECT p.*, u.nome as nome_submetido_por, u2.nome as nome_atribuido_para,
+           (SELECT GROUP_CONCAT(ua.nome, ', ')
+            FROM atribuicoes a
+            JOIN usuarios ua ON a.usuario_id = ua.id
+            WHERE a.problema_id = p.id) as nomes_atribuidos
+    FROM problemas p 
+    LEFT JOIN usuarios u ON p.submetido_por = u.id 
+    LEFT JOIN usuarios u2 ON p.atribuido_para = u2.id
+'''
+
+def _cortar_pagina(problemas, tamanho_pagina, cursor_do_ultimo):
+    """Separar a linha extra (tamanho_pagina + 1) que indica a existência de uma próxima página"""
+    if len(problemas) <= tamanho_pagina:
+        return problemas, None
+    problemas = problemas[:tamanho_pagina]
+    return problemas, cursor_do_ultimo(problemas[-1])
+
+def obter_pagina_problemas(cursor=None, tamanho_pagina=TAMANHO_PAGINA, submetido_por=None):
+    """Página de tickets do mais recente para o mais antigo.
+    
+    cursor é a tupla (criado_em, id) devolvida pela página anterior. Retorna
+    (problemas, proximo_cursor), com proximo_cursor None na última página.
+    As colunas são as de obter_todos_problemas() mais 'nomes_atribuidos' (separados por vírgula).
+    """
+    with obter_conexao() as conn:
+        c = conn.cursor()
+    
+        filtros = []
+        parametros = []
+        if submetido_por is not None:
+            filtros.append('p.submetido_por = ?')
+            parametros.append(submetido_por)
+        if cursor is not None:
+            filtros.append('(p.criado_em, p.id) < (?, ?)')
+            parametros.extend(cursor)
+        where = f"WHERE {' AND '.join(filtros)}" if filtros else ''
+    
+        c.execute(f'''
+            {_SELECT_PROBLEMAS_PAGINA}
+            {where}
+            ORDER BY p.criado_em DESC, p.id DESC
+            LIMIT ?
+        ''', parametros + [tamanho_pagina + 1])
+        problemas = c.fetchall()
+    
+        return _cortar_pagina(problemas, tamanho_pagina, lambda p: (p[8], p[0]))
+
+# Expressões de idx_problemas_disponiveis: a consulta precisa repeti-las para usar o índice
+def _sql_status_disponivel(coluna='p.status'):
+    return f"{coluna} IN ('aberto', 'em andamento')"
+
+def _sql_ordem_prioridade(coluna='p.prioridade'):
+    """Posição da prioridade em ORDEM_PRIORIDADE"""
+    return f'CASE {coluna} ' + ' '.join(
+        f"WHEN '{prioridade}' THEN {ordem}" for prioridade, ordem in ORDEM_PRIORIDADE.items()
+    ) + ' ELSE 5 END'
+
+def obter_pagina_problemas_disponiveis(usuario_id, cursor=None, tamanho_pagina=TAMANHO_PAGINA):
+    """Página de tickets abertos não atribuídos ao usuário, por prioridade e depois mais recentes.
+    
+    cursor é a tupla (ordem_prioridade, criado_em, id) devolvida pela página anterior.
+    Com cursor, o resto da mesma prioridade e as prioridades seguintes são duas
+    consultas que partem do ponto certo de idx_problemas_disponiveis, sem ordenar.
+    """
+    with obter_conexao() as conn:
+        c = conn.cursor()
+    
+        ordem_sql = _sql_ordem_prioridade()
+        # Sem estatísticas (ANALYZE), o planejador prefere o índice de status e ordena tudo
+        select = _SELECT_PROBLEMAS_PAGINA.replace(
+            'FROM problemas p', 'FROM problemas p INDEXED BY idx_problemas_disponiveis', 1
+        )
+        filtros = f"{_sql_status_disponivel()} AND (p.atribuido_para IS NULL OR p.atribuido_para != ?)"
+        limite = tamanho_pagina + 1
+        if cursor is None:
+            c.execute(f'''
+                {select}
+                WHERE {filtros}
+                ORDER BY {ordem_sql}, p.criado_em DESC, p.id DESC
+                LIMIT ?
+            ''', (usuario_id, limite))
+            problemas = c.fetchall()
+        else:
+            ordem, criado_em, problema_id = cursor
+            c.execute(f'''
+                {select}
+                WHERE {filtros} AND {ordem_sql} = ? AND (p.criado_em, p.id) < (?, ?)
+                ORDER BY p.criado_em DESC, p.id DESC
+                LIMIT ?
+            ''', (usuario_id, ordem, criado_em, problema_id, limite))
+            problemas = c.fetchall()
+            if len(problemas) < limite:
+                c.execute(f'''
+                    {select}
+                    WHERE {filtros} AND {ordem_sql} > ?
+                    ORDER BY {ordem_sql}, p.criado_em DESC, p.id DESC
+                    LIMIT ?
+                ''', (usuario_id, ordem, limite - len(problemas)))
+                problemas += c.fetchall()
+    
+        return _cortar_pagina(
+            problemas, tamanho_pagina,
+            lambda p: (ORDEM_PRIORIDADE.get(p[5], 5), p[8], p[0])
+        )
+
+# Busca textual nos tickets (FTS5)
+PESOS_BUSCA_TICKETS = (10.0, 4.0, 2.0)  # Pesos bm25 de título, descrição e solução
+
+def montar_consulta_fts(termos):
+    """Converter o texto digitado numa consulta FTS5 segura.
+    
+    Cada palavra vira um termo entre aspas (exigido em conjunto); a última
+    é tratada como prefixo, para que a busca funcione enquanto se digita.
+    """
+    palavras = re.findall(r'\w+', termos or '')
+    if not palavras:
+        return None
+    termos_fts = [f'"{palavra}"' for palavra in palavras]
+    termos_fts[-1] += '*'
+    return ' '.join(termos_fts)
+
+STATUS_VISIVEIS_A_TODOS = ('aberto', 'em andamento')  # Os de "Tickets Disponíveis"
+
+def _filtro_escopo_tickets(usuario_id, is_admin):
+    """Tickets que o usuário pode ver: admin vê todos; os demais, os próprios, os
+    atribuídos a eles e os disponíveis para resolução"""
+    if is_admin:
+        return '', []
+    marcadores = ', '.join('?' * len(STATUS_VISIVEIS_A_TODOS))
+    return (
+        f'AND (p.submetido_por = ? OR p.atribuido_para = ? OR p.status IN ({marcadores}) '
+        'OR EXISTS (SELECT 1 FROM atribuicoes atr WHERE atr.problema_id = p.id AND atr.usuario_id = ?))',
+        [usuario_id, usuario_id, *STATUS_VISIVEIS_A_TODOS, usuario_id]
+    )
+
+def buscar_tickets(termos, usuario_id, is_admin, limite=20, submetido_por=None, status=None):
+    """Buscar tickets por texto, ordenados por relevância (bm25).
+    
+    A busca fica restrita, no próprio SQL, aos tickets visíveis para usuario_id
+    (todos, se is_admin); submetido_por e status a restringem ainda mais. Retorna tuplas (id, ticket_id, titulo, status, prioridade, relevancia, trecho),
+    onde trecho destaca os termos encontrados em negrito (Markdown).
+    """
+    consulta = montar_consulta_fts(termos)
+    if consulta is None:
+        return []
     
-    return problemas
+    with obter_conexao() as conn:
+        c = conn.cursor()
+    
+        filtro_escopo, parametros_escopo = _filtro_escopo_tickets(usuario_id, is_admin)
+        filtros = [filtro_escopo]
+        parametros = [consulta] + parametros_escopo
+        if submetido_por is not None:
+            filtros.append('AND p.submetido_por = ?')
+            parametros.append(submetido_por)
+        if status:
+            filtros.append(f"AND p.status IN ({', '.join('?' * len(status))})")
+            parametros.extend(status)
+        c.execute(f'''
+            SELECT p.id, p.ticket_id, p.titulo, p.status, p.prioridade,
+                   bm25(problemas_fts, {', '.join(str(peso) for peso in PESOS_BUSCA_TICKETS)}) as relevancia,
+                   snippet(problemas_fts, -1, '**', '**', '…', 16) as trecho
+            FROM problemas_fts
+            JOIN problemas p ON p.id = problemas_fts.rowid
+            WHERE problemas_fts MATCH ? {' '.join(filtros)}
+            ORDER BY relevancia
+            LIMIT ?
+        ''', parametros + [limite])
+    
+        return c.fetchall()
 
 # Obter problemas do usuário
 def obter_problemas_usuario(usuario_id):
-    conn = sqlite3.connect('sistema_suporte.db')
-    c = conn.cursor()
+    with obter_conexao() as conn:
+        c = conn.cursor()
     
-    c.execute('''
-        SELECT p.*, u.nome as nome_submetido_por, u2.nome as nome_atribuido_para
-        FROM problemas p 
-        LEFT JOIN usuarios u ON p.submetido_por = u.id 
-        LEFT JOIN usuarios u2 ON p.atribuido_para = u2.id
-        WHERE p.submetido_por = ?
-        ORDER BY p.criado_em DESC
-    ''', (usuario_id,))
-    problemas = c.fetchall()
-    conn.close()
-    
-    return problemas
+        c.execute('''
+            SELECT p.*, u.nome as nome_submetido_por, u2.nome as nome_atribuido_para
+            FROM problemas p 
+            LEFT JOIN usuarios u ON p.submetido_por = u.id 
+            LEFT JOIN usuarios u2 ON p.atribuido_para = u2.id
+            WHERE p.submetido_por = ?
+            ORDER BY p.criado_em DESC
+        ''', (usuario_id,))
+        problemas = c.fetchall()
+    
+        return problemas
 
 # Atribuir usuário ao problema
 def atribuir_ao_problema(problema_id, usuario_id):
-    conn = sqlite3.connect('sistema_suporte.db')
-    c = conn.cursor()
+    with obter_conexao() as conn:
+        c = conn.cursor()
     
-    # Atualizar a atribuição principal do problema
-    c.execute('UPDATE problemas SET atribuido_para = ? WHERE id = ?', (usuario_id, problema_id))
+        # Atualizar a atribuição principal do problema
+        c.execute('UPDATE problemas SET atribuido_para = ? WHERE id = ?', (usuario_id, problema_id))
     
-    # Verificar se já está atribuído na tabela de atribuições
-    c.execute('SELECT * FROM atribuicoes WHERE problema_id = ? AND usuario_id = ?', 
-              (problema_id, usuario_id))
-    existente = c.fetchone()
-    
-    if not existente:
-        c.execute('INSERT INTO atribuicoes (problema_id, usuario_id) VALUES (?, ?)', 
+        # Registrar a atribuição (o índice único ignora atribuições repetidas)
+        c.execute('INSERT OR IGNORE INTO atribuicoes (problema_id, usuario_id) VALUES (?, ?)', 
                   (problema_id, usuario_id))
     
-    conn.commit()
-    conn.close()
-    return True
+        conn.commit()
+        return True
 
 # Obter atribuições para o problema
 def obter_atribuicoes_problema(problema_id):
-    conn = sqlite3.connect('sistema_suporte.db')
-    c = conn.cursor()
-    
-    c.execute('''
-        SELECT a.*, u.nome as nome_usuario 
-        FROM atribuicoes a 
-        JOIN usuarios u ON a.usuario_id = u.id 
-        WHERE a.problema_id = ?
-    ''', (problema_id,))
-    atribuicoes = c.fetchall()
-    conn.close()
+    with obter_conexao() as conn:
+        c = conn.cursor()
     
-    return atribuicoes
+        c.execute('''
+            SELECT a.*, u.nome as nome_usuario 
+            FROM atribuicoes a 
+            JOIN usuarios u ON a.usuario_id = u.id 
+            WHERE a.problema_id = ?
+        ''', (problema_id,))
+        atribuicoes = c.fetchall()
+    
+        return atribuicoes
 
 # Adicionar evento ao calendário
 def adicionar_evento_calendario(problema_id, titulo, descricao, data_evento, criado_por):
-    conn = sqlite3.connect('sistema_suporte.db')
-    c = conn.cursor()
+    with obter_conexao() as conn:
+        c = conn.cursor()
     
-    c.execute('''
-        INSERT INTO eventos_calendario (problema_id, titulo, descricao, data_evento, criado_por)
-        VALUES (?, ?, ?, ?, ?)
-    ''', (problema_id, titulo, descricao, data_evento, criado_por))
+        c.execute('''
+            INSERT INTO eventos_calendario (problema_id, titulo, descricao, data_evento, criado_por)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (problema_id, titulo, descricao, data_evento, criado_por))
     
-    conn.commit()
-    conn.close()
+        conn.commit()
 
 # Obter eventos do calendário - CORRIGIDA
 def obter_eventos_calendario(usuario_id=None):
-    conn = sqlite3.connect('sistema_suporte.db')
-    c = conn.cursor()
+    with obter_conexao() as conn:
+        c = conn.cursor()
     
-    try:
-        if usuario_id:
-            c.execute('''
-                SELECT ce.*, p.titulo as titulo_problema, u.nome as nome_criado_por
-                FROM eventos_calendario ce
-                LEFT JOIN problemas p ON ce.problema_id = p.id
-                LEFT JOIN usuarios u ON ce.criado_por = u.id
-                WHERE ce.criado_por = ? OR ce.problema_id IN (
-                    SELECT problema_id FROM atribuicoes WHERE usuario_id = ?
-                )
-                ORDER BY ce.data_evento
-            ''', (usuario_id, usuario_id))
-        else:
-            c.execute('''
-                SELECT ce.*, p.titulo as titulo_problema, u.nome as nome_criado_por
-                FROM eventos_calendario ce
-                LEFT JOIN problemas p ON ce.problema_id = p.id
-                LEFT JOIN usuarios u ON ce.criado_por = u.id
-                ORDER BY ce.data_evento
-            ''')
+        try:
+            if usuario_id:
+                c.execute('''
+                    SELECT ce.*, p.titulo as titulo_problema, u.nome as nome_criado_por
+                    FROM eventos_calendario ce
+                    LEFT JOIN problemas p ON ce.problema_id = p.id
+                    LEFT JOIN usuarios u ON ce.criado_por = u.id
+                    WHERE ce.criado_por = ? OR ce.problema_id IN (
+                        SELECT problema_id FROM atribuicoes WHERE usuario_id = ?
+                    )
+                    ORDER BY ce.data_evento
+                ''', (usuario_id, usuario_id))
+            else:
+                c.execute('''
+                    SELECT ce.*, p.titulo as titulo_problema, u.nome as nome_criado_por
+                    FROM eventos_calendario ce
+                    LEFT JOIN problemas p ON ce.problema_id = p.id
+                    LEFT JOIN usuarios u ON ce.criado_por = u.id
+                    ORDER BY ce.data_evento
+                ''')
         
-        eventos = c.fetchall()
-        return eventos
+            eventos = c.fetchall()
+            return eventos
         
-    except Exception as e:
-        st.error(f"Erro ao obter eventos: {str(e)}")
-        return []
-    finally:
-        conn.close()
+        except Exception as e:
+            st.error(f"Erro ao obter eventos: {str(e)}")
+            return []
 
 # Funções de anexo de arquivos
 def salvar_anexo_arquivo(problema_id, nome_arquivo, dados_arquivo, tipo_arquivo, enviado_por):
-    conn = sqlite3.connect('sistema_suporte.db')
-    c = conn.cursor()
+    """Registrar o anexo no banco (apenas o hash) e gravar o conteúdo no armazenamento de anexos.
     
-    c.execute('''
-        INSERT INTO anexos_arquivos (problema_id, nome_arquivo, dados_arquivo, tipo_arquivo, enviado_por)
-        VALUES (?, ?, ?, ?, ?)
-    ''', (problema_id, nome_arquivo, dados_arquivo, tipo_arquivo, enviado_por))
+    dados_arquivo pode ser bytes ou um objeto de arquivo, que é lido em blocos.
+    """
+    if isinstance(dados_arquivo, (bytes, bytearray)):
+        dados_arquivo = io.BytesIO(dados_arquivo)
+    armazenamento = obter_armazenamento_anexos()
+    hash_arquivo, tamanho, temporario = armazenamento.receber(dados_arquivo)
+    
+    with obter_conexao() as conn:
+        c = conn.cursor()
+        try:
+            c.execute('''
+                INSERT INTO anexos_arquivos (problema_id, nome_arquivo, dados_arquivo, tipo_arquivo, enviado_por,
+                                             tamanho_arquivo, hash_arquivo)
+                VALUES (?, ?, X'', ?, ?, ?, ?)
+            ''', (problema_id, nome_arquivo, tipo_arquivo, enviado_por, tamanho, hash_arquivo))
+            anexo_id = c.lastrowid
+            conn.commit()
+        except Exception:
+            armazenamento.descartar(temporario)
+            raise
+    
+        # O conteúdo é publicado depois do commit: com a referência já registrada, a limpeza de
+        # órfãos não pode remover o arquivo entre a publicação e o INSERT
+        try:
+            armazenamento.confirmar(hash_arquivo, temporario)
+        except Exception:
+            remover_anexo_arquivo(anexo_id)
+            raise
+        return anexo_id
+
+def remover_anexo_arquivo(arquivo_id):
+    """Remover o registro do anexo; o conteúdo sai do disco na próxima limpeza de órfãos"""
+    with obter_conexao() as conn:
+        c = conn.cursor()
+        c.execute('DELETE FROM anexos_arquivos WHERE id = ?', (arquivo_id,))
+        conn.commit()
+
+def limpar_conteudos_orfaos():
+    """Apagar do armazenamento os conteúdos que nenhum anexo referencia mais"""
+    with obter_conexao() as conn:
+        armazenamento = obter_armazenamento_anexos()
     
-    conn.commit()
-    conn.close()
+        # BEGIN IMMEDIATE impede novos anexos de referenciarem estes conteúdos durante a limpeza
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            orfaos = [linha[0] for linha in conn.execute(
+                'SELECT hash_arquivo FROM conteudos_anexos WHERE referencias <= 0'
+            ).fetchall()]
+            for hash_arquivo in orfaos:
+                armazenamento.remover(hash_arquivo)
+            conn.execute('''
+                DELETE FROM textos_anexos WHERE hash_arquivo IN (
+                    SELECT hash_arquivo FROM conteudos_anexos WHERE referencias <= 0
+                )
+            ''')
+            conn.execute('DELETE FROM conteudos_anexos WHERE referencias <= 0')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return len(orfaos)
+
+def obter_resumo_armazenamento_anexos():
+    """Totais do armazenamento: anexos, conteúdos únicos, bytes gravados e bytes economizados"""
+    with obter_conexao() as conn:
+        c = conn.cursor()
+        c.execute('''
+            SELECT (SELECT COUNT(*) FROM anexos_arquivos),
+                   (SELECT COUNT(*) FROM conteudos_anexos WHERE referencias > 0),
+                   (SELECT COALESCE(SUM(tamanho_arquivo), 0) FROM conteudos_anexos WHERE referencias > 0),
+                   (SELECT COALESCE(SUM(tamanho_arquivo), 0) FROM anexos_arquivos)
+        ''')
+        total_anexos, conteudos_unicos, bytes_armazenados, bytes_anexados = c.fetchone()
+        return {
+            'total_anexos': total_anexos,
+            'conteudos_unicos': conteudos_unicos,
+            'bytes_armazenados': bytes_armazenados,
+            'bytes_economizados': bytes_anexados - bytes_armazenados
+        }
 
 def obter_anexos_arquivos(problema_id):
-    conn = sqlite3.connect('sistema_suporte.db')
-    c = conn.cursor()
+    """Listar apenas os metadados dos anexos (o conteúdo fica em obter_dados_anexo).
     
-    c.execute('''
-        SELECT fa.*, u.nome as nome_enviado_por
-        FROM anexos_arquivos fa
-        JOIN usuarios u ON fa.enviado_por = u.id
-        WHERE fa.problema_id = ?
-        ORDER BY fa.enviado_em DESC
-    ''', (problema_id,))
+    Colunas: id, problema_id, nome_arquivo, tamanho_arquivo, tipo_arquivo,
+    enviado_por, enviado_em, nome_enviado_por.
+    """
+    with obter_conexao() as conn:
+        c = conn.cursor()
     
-    anexos = c.fetchall()
-    conn.close()
-    return anexos
+        c.execute('''
+            SELECT fa.id, fa.problema_id, fa.nome_arquivo,
+                   COALESCE(fa.tamanho_arquivo, LENGTH(fa.dados_arquivo)) as tamanho_arquivo, fa.tipo_arquivo,
+                   fa.enviado_por, fa.enviado_em, u.nome as nome_enviado_por
+            FROM anexos_arquivos fa
+            JOIN usuarios u ON fa.enviado_por = u.id
+            WHERE fa.problema_id = ?
+            ORDER BY fa.enviado_em DESC
+        ''', (problema_id,))
+    
+        anexos = c.fetchall()
+        return anexos
 
 def obter_anexo_arquivo(arquivo_id):
-    conn = sqlite3.connect('sistema_suporte.db')
-    c = conn.cursor()
+    with obter_conexao() as conn:
+        c = conn.cursor()
     
-    c.execute('SELECT * FROM anexos_arquivos WHERE id = ?', (arquivo_id,))
-    anexo = c.fetchone()
-    conn.close()
-    return anexo
+        c.execute('SELECT * FROM anexos_arquivos WHERE id = ?', (arquivo_id,))
+        anexo = c.fetchone()
+        return anexo
+
+class LeitorBlob(io.RawIOBase):
+    """sqlite3.Blob como arquivo binário comum, lido em blocos (o st.download_button não aceita o Blob)"""
+    
+    def __init__(self, blob):
+        self.blob = blob
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, destino):
+        dados = self.blob.read(len(destino))
+        destino[:len(dados)] = dados
+        return len(dados)
+    
+    def seekable(self):
+        return True
+    
+    def seek(self, posicao, origem=io.SEEK_SET):
+        self.blob.seek(posicao, origem)
+        return self.blob.tell()
+    
+    def tell(self):
+        return self.blob.tell()
+    
+    def close(self):
+        if not self.closed:
+            self.blob.close()
+        super().close()
+
+@contextmanager
+def abrir_anexo(arquivo_id):
+    """Abrir o conteúdo de um anexo como arquivo binário para leitura em blocos"""
+    with obter_conexao() as conn:
+        c = conn.cursor()
+    
+        c.execute('SELECT hash_arquivo FROM anexos_arquivos WHERE id = ?', (arquivo_id,))
+        linha = c.fetchone()
+        if not linha:
+            raise FileNotFoundError(f"Anexo {arquivo_id} não encontrado")
+        if linha[0]:
+            arquivo = obter_armazenamento_anexos().abrir(linha[0])
+        else:
+            # Anexos gravados diretamente no banco (por exemplo, pela versão main2.py)
+            arquivo = io.BufferedReader(
+                LeitorBlob(conn.blobopen('anexos_arquivos', 'dados_arquivo', arquivo_id, readonly=True)),
+                TAMANHO_BLOCO_ANEXOS
+            )
+        with arquivo:
+            yield arquivo
+
+def obter_dados_anexo(arquivo_id):
+    """Ler o conteúdo completo de um anexo"""
+    try:
+        with abrir_anexo(arquivo_id) as arquivo:
+            return arquivo.read()
+    except FileNotFoundError:
+        return None
+
+def formatar_tamanho(tamanho_bytes):
+    tamanho = float(tamanho_bytes or 0)
+    for unidade in ['B', 'KB', 'MB']:
+        if tamanho < 1024:
+            return f"{tamanho:.0f} {unidade}" if unidade == 'B' else f"{tamanho:.1f} {unidade}"
+        tamanho /= 1024
+    return f"{tamanho:.1f} GB"
 
 # Funções de busca
 def salvar_resultado_busca(problema_id, consulta_busca, titulo_resultado, url_resultado, snippet_resultado, motor_busca):
-    conn = sqlite3.connect('sistema_suporte.db')
-    c = conn.cursor()
+    with obter_conexao() as conn:
+        c = conn.cursor()
     
-    c.execute('''
-        INSERT INTO resultados_busca (problema_id, consulta_busca, titulo_resultado, url_resultado, snippet_resultado, motor_busca)
-        VALUES (?, ?, ?, ?, ?, ?)
-    ''', (problema_id, consulta_busca, titulo_resultado, url_resultado, snippet_resultado, motor_busca))
+        c.execute('''
+            INSERT INTO resultados_busca (problema_id, consulta_busca, titulo_resultado, url_resultado, snippet_resultado, motor_busca)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (problema_id, consulta_busca, titulo_resultado, url_resultado, snippet_resultado, motor_busca))
     
-    conn.commit()
-    conn.close()
+        conn.commit()
 
 def obter_resultados_busca(problema_id):
-    conn = sqlite3.connect('sistema_suporte.db')
-    c = conn.cursor()
+    with obter_conexao() as conn:
+        c = conn.cursor()
     
-    c.execute('''
-        SELECT * FROM resultados_busca 
-        WHERE problema_id = ? 
-        ORDER BY buscado_em DESC
-    ''', (problema_id,))
+        c.execute('''
+            SELECT * FROM resultados_busca 
+            WHERE problema_id = ? 
+            ORDER BY buscado_em DESC
+        ''', (problema_id,))
     
-    resultados = c.fetchall()
-    conn.close()
+        resultados = c.fetchall()
+        return resultados
+
+# Cache das buscas na web: chave (consulta normalizada, max_resultados).
+# Até TTL_CACHE_BUSCA_SEGUNDOS o resultado é servido direto; depois, por mais
+# JANELA_OBSOLETA_BUSCA_SEGUNDOS, é servido obsoleto enquanto uma thread o atualiza.
+TTL_CACHE_BUSCA_SEGUNDOS = int(os.environ.get('SISTEMA_SUPORTE_TTL_BUSCA', 3600))
+JANELA_OBSOLETA_BUSCA_SEGUNDOS = int(os.environ.get('SISTEMA_SUPORTE_JANELA_OBSOLETA_BUSCA', 86400))
+
+_atualizacoes_busca = set()  # Chaves com atualização em segundo plano em andamento
+_trava_atualizacoes_busca = threading.Lock()
+
+def normalizar_consulta(consulta):
+    """Minúsculas e espaços colapsados: 'Erro  de Rede' e 'erro de rede' usam a mesma entrada"""
+    return ' '.join(consulta.casefold().split())
+
+def incrementar_contador_cache(nome):
+    with obter_conexao() as conn:
+        c = conn.cursor()
+        c.execute('''
+            INSERT INTO contadores_cache (nome, valor) VALUES (?, 1)
+            ON CONFLICT (nome) DO UPDATE SET valor = valor + 1
+        ''', (nome,))
+        conn.commit()
+
+def obter_contadores_cache():
+    with obter_conexao() as conn:
+        c = conn.cursor()
+        c.execute('SELECT nome, valor FROM contadores_cache')
+        return dict(c.fetchall())
+
+def obter_busca_em_cache(consulta_normalizada, max_resultados):
+    """Retorna (resultados, idade_em_segundos) ou None"""
+    with obter_conexao() as conn:
+        c = conn.cursor()
+        c.execute('''
+            SELECT resultados, criado_em FROM cache_buscas
+            WHERE consulta_normalizada = ? AND max_resultados = ?
+        ''', (consulta_normalizada, max_resultados))
+        linha = c.fetchone()
+        if linha is None:
+            return None
+        return json.loads(linha[0]), time.time() - linha[1]
+
+def gravar_busca_em_cache(consulta_normalizada, max_resultados, resultados):
+    """Guardar os resultados e remover as entradas que já passaram da janela de obsolescência"""
+    agora = time.time()
+    with obter_conexao() as conn:
+        c = conn.cursor()
+        c.execute('''
+            INSERT INTO cache_buscas (consulta_normalizada, max_resultados, resultados, criado_em)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (consulta_normalizada, max_resultados) DO UPDATE
+            SET resultados = excluded.resultados, criado_em = excluded.criado_em
+        ''', (consulta_normalizada, max_resultados, json.dumps(resultados), agora))
+        c.execute(
+            'DELETE FROM cache_buscas WHERE criado_em < ?',
+            (agora - TTL_CACHE_BUSCA_SEGUNDOS - JANELA_OBSOLETA_BUSCA_SEGUNDOS,)
+        )
+        conn.commit()
+
+def limpar_cache_buscas():
+    with obter_conexao() as conn:
+        c = conn.cursor()
+        c.execute('DELETE FROM cache_buscas')
+        removidas = c.rowcount
+        conn.commit()
+        return removidas
+
+def _atualizar_busca_em_segundo_plano(consulta, consulta_normalizada, max_resultados):
+    """Refazer a busca numa thread; apenas uma atualização por chave de cada vez"""
+    chave = (consulta_normalizada, max_resultados)
+    with _trava_atualizacoes_busca:
+        if chave in _atualizacoes_busca:
+            return
+        _atualizacoes_busca.add(chave)
+    
+    def atualizar():
+        try:
+            resposta = obter_despachante_busca().buscar_em_todos(consulta, max_resultados)
+            if resposta['resultados'] and resposta['web_respondeu']:
+                gravar_busca_em_cache(consulta_normalizada, max_resultados, resposta['resultados'])
+        except Exception:
+            pass  # O resultado obsoleto continua no cache; a próxima busca tenta de novo
+        finally:
+            with _trava_atualizacoes_busca:
+                _atualizacoes_busca.discard(chave)
+    
+    threading.Thread(target=atualizar, name="atualizacao-cache-busca", daemon=True).start()
+
+def buscar_no_duckduckgo(consulta, max_resultados=5, timeout=10):
+    """Busca direta no DuckDuckGo (sem cache); exceções de rede são propagadas"""
+    from duckduckgo_search import DDGS
+    
+    with DDGS(timeout=max(1, round(timeout))) as ddgs:
+        resultados = []
+        count = 0
+        for resultado in ddgs.text(consulta, max_results=max_resultados + 3):  # Buscar mais para filtrar
+            if count >= max_resultados:
+                break
+                
+            # Verificar se temos dados válidos
+            if (resultado.get('title') and resultado.get('href') and 
+                len(resultado.get('title', '').strip()) > 10):  # Filtrar títulos muito curtos
+                
+                resultado_formatado = {
+                    'title': resultado.get('title', 'Sem título').strip(),
+                    'href': resultado.get('href', '').strip(),
+                    'body': resultado.get('body', 'Sem descrição disponível.').strip()[:200] + '...'  # Limitar tamanho
+                }
+                resultados.append(resultado_formatado)
+                count += 1
+        
+        return resultados
+
+# Endereço da versão HTML do DuckDuckGo (pode apontar para um servidor local em testes)
+URL_BUSCA_HTML = os.environ.get('SISTEMA_SUPORTE_URL_BUSCA_HTML', 'https://html.duckduckgo.com/html/')
+
+def _link_real_duckduckgo(href):
+    """Os links da versão HTML passam por //duckduckgo.com/l/?uddg=<url>; retornar a URL de destino"""
+    if href.startswith('//'):
+        href = 'https:' + href
+    partes = urllib.parse.urlparse(href)
+    if partes.path == '/l/':
+        destino = urllib.parse.parse_qs(partes.query).get('uddg')
+        if destino:
+            return destino[0]
+    return href
+
+def buscar_no_duckduckgo_html(consulta, max_resultados=5, timeout=15):
+    """Busca na versão HTML do DuckDuckGo, sem a API; exceções de rede são propagadas"""
+    # Consulta feita a pedido do usuário (não é rastreamento): o limite de taxa vale, o robots.txt não
+    response = cliente_http.get(URL_BUSCA_HTML, params={'q': consulta}, timeout=timeout, respeitar_robots=False)
+    response.raise_for_status()
+    soup = BeautifulSoup(response.content, 'html.parser')
+    
+    resultados = []
+    for link in soup.find_all('a', class_='result__a', limit=max_resultados):
+        descricao_element = link.find_next('a', class_='result__snippet')
+        resultados.append({
+            'title': link.get_text(strip=True),
+            'href': _link_real_duckduckgo(link.get('href', '')),
+            'body': descricao_element.get_text(strip=True) if descricao_element else "Sem descrição"
+        })
     return resultados
 
+class ProvedorBaseConhecimento(despacho_busca.ProvedorBusca):
+    """Tickets resolvidos cujo texto casa com a consulta (busca FTS local)"""
+    nome = 'Base de Conhecimento'
+    local = True
+    
+    def buscar(self, consulta, max_resultados, timeout):
+        # A base de conhecimento é de todos: as soluções publicadas servem a qualquer usuário
+        tickets = buscar_tickets(consulta, usuario_id=None, is_admin=True, limite=max_resultados,
+                                 status=('resolvido',))
+        return [
+            {
+                'title': f"[{ticket_id}] {titulo}",
+                'href': f"ticket://{ticket_id}",
+                'body': trecho
+            }
+            for _, ticket_id, titulo, _, _, _, trecho in tickets
+        ]
+
+def criar_provedores_busca():
+    """Provedores consultados em cada busca; para incluir outro, basta acrescentá-lo aqui.
+    
+    A API e o HTML do DuckDuckGo dão os mesmos resultados: em vez de fundi-los, o HTML
+    só é disparado quando a API demora além do seu p95 ou falha.
+    """
+    return [
+        despacho_busca.ProvedorEscalonado('Web', [
+            despacho_busca.MotorBusca('DuckDuckGo', buscar_no_duckduckgo),
+            despacho_busca.MotorBusca('DuckDuckGo HTML', buscar_no_duckduckgo_html),
+        ]),
+        ProvedorBaseConhecimento(),
+    ]
+
+@st.cache_resource(show_spinner=False)
+def obter_despachante_busca():
+    """Disjuntores e latências dos provedores são compartilhados pelas sessões"""
+    return despacho_busca.DespachanteBusca(criar_provedores_busca())
+
 # Funcionalidade de busca na web - VERSÃO MELHORADA
 def buscar_na_web(consulta, max_resultados=5):
-    """Buscar usando DuckDuckGo - Versão Robusta"""
+    """Buscar usando DuckDuckGo - Versão Robusta, com cache das buscas repetidas"""
+    consulta_normalizada = normalizar_consulta(consulta)
+    em_cache = obter_busca_em_cache(consulta_normalizada, max_resultados)
+    if em_cache is not None:
+        resultados, idade = em_cache
+        if idade < TTL_CACHE_BUSCA_SEGUNDOS:
+            incrementar_contador_cache('busca_acerto')
+            return resultados
+        if idade < TTL_CACHE_BUSCA_SEGUNDOS + JANELA_OBSOLETA_BUSCA_SEGUNDOS:
+            incrementar_contador_cache('busca_obsoleta')
+            _atualizar_busca_em_segundo_plano(consulta, consulta_normalizada, max_resultados)
+            return resultados
+    incrementar_contador_cache('busca_falha')
+    
+    # Métodos 1 e 2: todos os provedores ao mesmo tempo, resultados fundidos por RRF
+    resposta = obter_despachante_busca().buscar_em_todos(consulta, max_resultados)
+    if resposta['resultados'] or not resposta['erros']:
+        # Guarda no cache se ao menos um provedor da web respondeu: um provedor fora do ar
+        # ou com o disjuntor aberto não pode fazer toda busca repetida voltar à rede
+        if resposta['resultados'] and resposta['web_respondeu']:
+            gravar_busca_em_cache(consulta_normalizada, max_resultados, resposta['resultados'])
+        return resposta['resultados']
+    
+    detalhes = '; '.join(f"{motor}: {erro}" for motor, erro in resposta['erros'].items())
+    st.error(f"Erro na busca: {detalhes}")
+    
+    # Método 3: Fallback - Busca simulada
     try:
-        # Método 1: DuckDuckGo Search
-        from duckduckgo_search import DDGS
-        
-        with DDGS() as ddgs:
-            resultados = []
-            count = 0
-            for resultado in ddgs.text(consulta, max_results=max_resultados + 3):  # Buscar mais para filtrar
-                if count >= max_resultados:
-                    break
-                    
-                # Verificar se temos dados válidos
-                if (resultado.get('title') and resultado.get('href') and 
-                    len(resultado.get('title', '').strip()) > 10):  # Filtrar títulos muito curtos
-                    
-                    resultado_formatado = {
-                        'title': resultado.get('title', 'Sem título').strip(),
-                        'href': resultado.get('href', '').strip(),
-                        'body': resultado.get('body', 'Sem descrição disponível.').strip()[:200] + '...'  # Limitar tamanho
-                    }
-                    resultados.append(resultado_formatado)
-                    count += 1
-            
-            return resultados if resultados else []
-            
-    except Exception as e:
-        st.error(f"Erro na busca DuckDuckGo: {str(e)}")
-        
-        # Método 2: Fallback - Busca simulada
-        try:
-            st.info("Usando busca simulada devido a problemas de conexão...")
-            return busca_simulada(consulta, max_resultados)
-        except Exception as e2:
-            st.error(f"Busca simulada também falhou: {str(e2)}")
-            return []
+        st.info("Usando busca simulada devido a problemas de conexão...")
+        return [dict(resultado, motores=['Busca Simulada']) for resultado in busca_simulada(consulta, max_resultados)]
+    except Exception as e2:
+        st.error(f"Busca simulada também falhou: {str(e2)}")
+        return []
 
 def busca_simulada(consulta, max_resultados=3):
     """Busca simulada para quando a API falha"""
@@ -428,59 +1539,137 @@ def busca_simulada(consulta, max_resultados=3):
     ]
     return resultados_simulados[:max_resultados]
 
+# Cache das páginas extraídas: guarda o resultado já analisado ({titulo, conteudo}) com o
+# ETag/Last-Modified da resposta; uma revalidação com 304 evita o download e a análise
+DIAS_CACHE_PAGINAS = 30  # Páginas não atualizadas há mais tempo são removidas
+
+def _validade_cache_control(cabecalho):
+    """Retorna (pode_guardar, segundos_de_validade) a partir do Cache-Control"""
+    diretivas = [diretiva.strip().lower() for diretiva in (cabecalho or '').split(',')]
+    if 'no-store' in diretivas:
+        return False, 0
+    if 'no-cache' in diretivas:
+        return True, 0
+    for diretiva in diretivas:
+        if diretiva.startswith('max-age='):
+            try:
+                return True, max(0, int(diretiva[len('max-age='):]))
+            except ValueError:
+                break
+    return True, 0
+
+def obter_pagina_em_cache(url):
+    """Página em cache analisada pelo extrator atual, ou None"""
+    with obter_conexao() as conn:
+        c = conn.cursor()
+        c.execute('''
+            SELECT etag, ultima_modificacao, expira_em, titulo, conteudo
+            FROM cache_paginas WHERE url = ? AND versao_extrator = ?
+        ''', (url, extracao_conteudo.versao_extrator()))
+        linha = c.fetchone()
+        if linha is None:
+            return None
+        return dict(zip(('etag', 'ultima_modificacao', 'expira_em', 'titulo', 'conteudo'), linha))
+
+def gravar_pagina_em_cache(url, response, titulo, conteudo):
+    """Guardar o resultado da análise com os validadores da resposta"""
+    pode_guardar, validade = _validade_cache_control(response.headers.get('Cache-Control'))
+    etag = response.headers.get('ETag')
+    ultima_modificacao = response.headers.get('Last-Modified')
+    if not pode_guardar or not (etag or ultima_modificacao or validade):
+        return  # Sem como revalidar nem tempo de validade: não vale guardar
+    agora = time.time()
+    with obter_conexao() as conn:
+        c = conn.cursor()
+        c.execute('''
+            INSERT INTO cache_paginas (url, etag, ultima_modificacao, expira_em, titulo, conteudo, atualizado_em,
+                                       versao_extrator)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (url) DO UPDATE
+            SET etag = excluded.etag, ultima_modificacao = excluded.ultima_modificacao,
+                expira_em = excluded.expira_em, titulo = excluded.titulo,
+                conteudo = excluded.conteudo, atualizado_em = excluded.atualizado_em,
+                versao_extrator = excluded.versao_extrator
+        ''', (url, etag, ultima_modificacao, agora + validade, titulo, conteudo, agora,
+              extracao_conteudo.versao_extrator()))
+        c.execute('DELETE FROM cache_paginas WHERE atualizado_em < ?', (agora - DIAS_CACHE_PAGINAS * 86400,))
+        conn.commit()
+
+def renovar_pagina_em_cache(url, response):
+    """Após um 304, a entrada continua válida pelo novo Cache-Control"""
+    _, validade = _validade_cache_control(response.headers.get('Cache-Control'))
+    agora = time.time()
+    with obter_conexao() as conn:
+        c = conn.cursor()
+        c.execute('''
+            UPDATE cache_paginas
+            SET expira_em = ?, atualizado_em = ?,
+                etag = COALESCE(?, etag), ultima_modificacao = COALESCE(?, ultima_modificacao)
+            WHERE url = ?
+        ''', (agora + validade, agora, response.headers.get('ETag'), response.headers.get('Last-Modified'), url))
+        conn.commit()
+
+# Download limitado: só os primeiros bytes da página são lidos e analisados
+LIMITE_BYTES_PAGINA = int(os.environ.get('SISTEMA_SUPORTE_LIMITE_PAGINA_KB', 512)) * 1024
+TAMANHO_BLOCO_PAGINA = 16 * 1024
+TIPOS_CONTEUDO_TEXTO = ('text/html', 'application/xhtml+xml', 'text/plain')
+
+def ler_resposta_limitada(response, limite=LIMITE_BYTES_PAGINA):
+    """Ler o corpo de uma resposta aberta com stream=True até `limite` bytes (já descomprimidos)"""
+    partes = []
+    lidos = 0
+    for bloco in response.iter_content(chunk_size=TAMANHO_BLOCO_PAGINA):
+        partes.append(bloco)
+        lidos += len(bloco)
+        if lidos >= limite:
+            break  # O restante da página nem é transferido
+    return b''.join(partes)[:limite]
+
+def extrair_conteudo_html(html):
+    """Analisar o HTML e retornar (titulo, conteudo) com o texto principal limitado a 1500 caracteres"""
+    return extracao_conteudo.extrair_conteudo(html, limite=1500)
+
 def buscar_com_beautiful_soup(url):
-    """Extrair conteúdo de uma URL usando BeautifulSoup"""
+    """Extrair conteúdo de uma URL usando BeautifulSoup (com cache e GET condicional)"""
     try:
         # Validar URL
         if not url.startswith(('http://', 'https://')):
             url = 'https://' + url
-            
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
-        
-        # Detectar encoding
-        if response.encoding is None:
-            response.encoding = 'utf-8'
-        
-        soup = BeautifulSoup(response.content, 'html.parser', from_encoding=response.encoding)
         
-        # Extrair título
-        titulo = "Sem título"
-        if soup.title and soup.title.string:
-            titulo = soup.title.string.strip()
-        
-        # Tentar encontrar o conteúdo principal
-        conteudo = ""
-        
-        # Procurar por tags comuns de conteúdo
-        tags_conteudo = ['article', 'main', 'div.content', 'div.main', 'section']
-        for tag in tags_conteudo:
-            elemento = soup.select_one(tag)
-            if elemento:
-                texto = elemento.get_text(strip=True)
-                if len(texto) > 100:  # Tem conteúdo significativo
-                    conteudo = texto
-                    break
+        em_cache = obter_pagina_em_cache(url)
+        cabecalhos = {}
+        if em_cache:
+            if time.time() < em_cache['expira_em']:
+                incrementar_contador_cache('pagina_acerto')
+                return {'titulo': em_cache['titulo'], 'conteudo': em_cache['conteudo'], 'url': url}
+            if em_cache['etag']:
+                cabecalhos['If-None-Match'] = em_cache['etag']
+            if em_cache['ultima_modificacao']:
+                cabecalhos['If-Modified-Since'] = em_cache['ultima_modificacao']
         
-        # Se não encontrou conteúdo estruturado, pegar todo o texto
-        if not conteudo:
-            # Remover scripts e estilos
-            for script in soup(["script", "style", "nav", "header", "footer"]):
-                script.decompose()
+        # stream=True: o corpo só é lido (e até o limite) depois de conferir status e tipo
+        with cliente_http.get(url, headers=cabecalhos, timeout=15, stream=True) as response:
+            if response.status_code == 304 and em_cache:
+                renovar_pagina_em_cache(url, response)
+                incrementar_contador_cache('pagina_revalidada')
+                return {'titulo': em_cache['titulo'], 'conteudo': em_cache['conteudo'], 'url': url}
+            response.raise_for_status()
             
-            conteudo = soup.get_text()
+            tipo_conteudo = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+            if tipo_conteudo and tipo_conteudo not in TIPOS_CONTEUDO_TEXTO:
+                return {'erro': f'Conteúdo não é uma página de texto ({tipo_conteudo})'}
+            
+            incrementar_contador_cache('pagina_falha')
+            dados = ler_resposta_limitada(response)
         
-        # Limpar e formatar o texto
-        linhas = (linha.strip() for linha in conteudo.splitlines())
-        chunks = (phrase.strip() for linha in linhas for phrase in linha.split("  "))
-        texto_limpo = ' '.join(chunk for chunk in chunks if chunk)
+        # Detectar encoding; um caractere cortado no fim do limite vira '�'
+        try:
+            html = dados.decode(response.encoding or 'utf-8', errors='replace')
+        except LookupError:
+            html = dados.decode('utf-8', errors='replace')
         
-        # Limitar tamanho
-        texto_final = texto_limpo[:1500] + '...' if len(texto_limpo) > 1500 else texto_limpo
+        titulo, texto_final = extrair_conteudo_html(html)
+        gravar_pagina_em_cache(url, response, titulo, texto_final)
         
         return {
             'titulo': titulo,
@@ -488,88 +1677,552 @@ def buscar_com_beautiful_soup(url):
             'url': url
         }
         
-    except requests.exceptions.RequestException as e:
+    except cliente_http.ErroRequisicao as e:
         return {'erro': f'Erro de conexão: {str(e)}'}
     except Exception as e:
         return {'erro': f'Erro na extração: {str(e)}'}
 
-# Funções de processamento de documentos
-def extrair_texto_de_pdf(arquivo):
-    """Extrair texto de arquivo PDF"""
-    try:
-        arquivo.seek(0)
-        pdf_reader = PyPDF2.PdfReader(arquivo)
-        texto = ""
-        for pagina in pdf_reader.pages:
-            texto_pagina = pagina.extract_text()
-            if texto_pagina:
-                texto += texto_pagina + "\n"
+# Extração de várias páginas ao mesmo tempo, num pool de threads compartilhado pelas sessões
+THREADS_EXTRACAO_PAGINAS = int(os.environ.get('SISTEMA_SUPORTE_THREADS_EXTRACAO_PAGINAS', 6))
+
+@st.cache_resource(show_spinner=False)
+def obter_pool_extracao_paginas():
+    """Um único pool por processo limita o total de downloads simultâneos"""
+    return ThreadPoolExecutor(max_workers=THREADS_EXTRACAO_PAGINAS, thread_name_prefix="extracao-pagina")
+
+# Pré-carregamento especulativo: as páginas dos primeiros resultados começam a ser
+# extraídas assim que a busca termina, num pool menor, para não disputar com os cliques
+PRE_CARREGAR_RESULTADOS = int(os.environ.get('SISTEMA_SUPORTE_PRE_CARREGAR_RESULTADOS', 3))
+PRE_CARREGAMENTOS_SIMULTANEOS = int(os.environ.get('SISTEMA_SUPORTE_PRE_CARREGAMENTOS_SIMULTANEOS', 2))
+VALIDADE_PRE_CARREGAMENTO_SEGUNDOS = 300
+
+_pre_carregamentos = {}  # url -> (futuro, instante do agendamento)
+_trava_pre_carregamentos = threading.Lock()
+
+@st.cache_resource(show_spinner=False)
+def obter_pool_pre_carregamento():
+    return ThreadPoolExecutor(max_workers=PRE_CARREGAMENTOS_SIMULTANEOS, thread_name_prefix="pre-carregamento")
+
+def pre_carregar_paginas(urls):
+    """Agendar a extração das URLs em segundo plano; retorna os futuros agendados (para cancelar)"""
+    pool = obter_pool_pre_carregamento()
+    agora = time.monotonic()
+    futuros = []
+    with _trava_pre_carregamentos:
+        for url, (futuro, instante) in list(_pre_carregamentos.items()):
+            if agora - instante >= VALIDADE_PRE_CARREGAMENTO_SEGUNDOS:
+                del _pre_carregamentos[url]
+        for url in urls:
+            existente = _pre_carregamentos.get(url)
+            if existente and not existente[0].cancelled():
+                continue  # Já agendada por esta ou por outra sessão
+            futuro = pool.submit(buscar_com_beautiful_soup, url)
+            _pre_carregamentos[url] = (futuro, agora)
+            futuros.append(futuro)
+    return futuros
+
+def cancelar_pre_carregamento(futuros):
+    """Cancelar o que ainda não começou; downloads em andamento terminam normalmente"""
+    for futuro in futuros:
+        futuro.cancel()
+
+def extrair_pagina(url):
+    """buscar_com_beautiful_soup, aproveitando um pré-carregamento em andamento ou concluído"""
+    with _trava_pre_carregamentos:
+        entrada = _pre_carregamentos.get(url)
+    if entrada:
+        futuro, instante = entrada
+        if time.monotonic() - instante < VALIDADE_PRE_CARREGAMENTO_SEGUNDOS and not futuro.cancelled():
+            try:
+                conteudo = futuro.result()
+                if 'erro' not in conteudo:
+                    return conteudo
+            except CancelledError:
+                pass  # Cancelado entre a verificação e a espera
+    return buscar_com_beautiful_soup(url)
+
+def extrair_paginas_em_paralelo(urls):
+    """Extrair várias URLs em paralelo; gera (indice, conteudo) na ordem em que terminam"""
+    pool = obter_pool_extracao_paginas()
+    futuros = {pool.submit(extrair_pagina, url): indice for indice, url in enumerate(urls)}
+    for futuro in as_completed(futuros):
+        yield futuros[futuro], futuro.result()
+
+# Cache de textos extraídos: chave (SHA-256 do conteúdo, versão do extrator), despejo LRU por tamanho
+LIMITE_CACHE_EXTRACAO_BYTES = int(os.environ.get('SISTEMA_SUPORTE_CACHE_EXTRACAO_MB', 256)) * 1024 * 1024
+
+def calcular_hash_arquivo(arquivo):
+    """SHA-256 de um arquivo binário, lido em blocos; a posição volta ao início"""
+    arquivo.seek(0)
+    hash_sha256 = hashlib.sha256()
+    for bloco in iter(lambda: arquivo.read(TAMANHO_BLOCO_ANEXOS), b''):
+        hash_sha256.update(bloco)
+    arquivo.seek(0)
+    return hash_sha256.hexdigest()
+
+def obter_texto_em_cache(hash_arquivo):
+    """Texto extraído em cache para o conteúdo, ou None; um acerto renova o acesso"""
+    with obter_conexao() as conn:
+        c = conn.cursor()
+        c.execute('''
+            UPDATE cache_extracao SET acessado_em = ?
+            WHERE hash_arquivo = ? AND versao_extrator = ?
+            RETURNING texto
+        ''', (time.time(), hash_arquivo, extracao_texto.versao_extrator()))
+        linha = c.fetchone()
+        conn.commit()
+        return linha[0] if linha else None
+
+def gravar_texto_em_cache(hash_arquivo, texto):
+    """Guardar o texto extraído e despejar as entradas menos usadas acima do limite"""
+    with obter_conexao() as conn:
+        c = conn.cursor()
+        c.execute('''
+            INSERT INTO cache_extracao (hash_arquivo, versao_extrator, texto, tamanho, acessado_em)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (hash_arquivo, versao_extrator) DO UPDATE
+            SET texto = excluded.texto, tamanho = excluded.tamanho, acessado_em = excluded.acessado_em
+        ''', (hash_arquivo, extracao_texto.versao_extrator(), texto, len(texto.encode('utf-8')), time.time()))
+        # Mantém as entradas mais recentes cuja soma de tamanhos cabe no limite
+        c.execute('''
+            DELETE FROM cache_extracao WHERE rowid IN (
+                SELECT rowid FROM (
+                    SELECT rowid, SUM(tamanho) OVER (ORDER BY acessado_em DESC, rowid DESC) AS acumulado
+                    FROM cache_extracao
+                )
+                WHERE acumulado > ?
+            )
+        ''', (LIMITE_CACHE_EXTRACAO_BYTES,))
+        conn.commit()
+
+def processar_arquivo_enviado(arquivo):
+    """Processar arquivo enviado e retornar conteúdo de texto (reenvios vêm do cache)"""
+    if extracao_texto.tipo_do_arquivo(arquivo.name) not in extracao_texto.TIPOS_SUPORTADOS:
+        return "Tipo de arquivo não suportado"
+    
+    hash_arquivo = calcular_hash_arquivo(arquivo)
+    texto = obter_texto_em_cache(hash_arquivo)
+    if texto is not None:
         return texto
+    
+    try:
+        texto = extracao_texto.extrair_texto(arquivo, arquivo.name)
     except Exception as e:
-        st.error(f"Erro na extração de PDF: {e}")
-        return ""
+        st.error(f"Erro na extração de texto: {e}")
+        return ""  # Falhas não vão para o cache
+    gravar_texto_em_cache(hash_arquivo, texto)
+    return texto
 
-def extrair_texto_de_word(arquivo):
-    """Extrair texto de documento Word"""
+# Texto dos anexos: extraído uma vez por conteúdo, em segundo plano, e indexado para busca
+MAX_TENTATIVAS_EXTRACAO = 3
+ESPERA_BASE_NOVA_TENTATIVA_SEGUNDOS = 30
+PROCESSOS_EXTRACAO = max(1, (os.cpu_count() or 2) // 2)
+INTERVALO_FILA_EXTRACAO_SEGUNDOS = 2
+TAREFA_TRAVADA_MINUTOS = 15  # Tarefas 'executando' há mais tempo voltam para a fila
+
+def enfileirar_extracao_anexo(anexo_id):
+    """Agendar a extração de texto do anexo; retorna imediatamente"""
+    with obter_conexao() as conn:
+        c = conn.cursor()
+        c.execute('INSERT INTO tarefas_extracao (anexo_id) VALUES (?)', (anexo_id,))
+        conn.commit()
+
+def reservar_tarefa_extracao():
+    """Marcar a próxima tarefa pendente como 'executando' e retornar (tarefa_id, anexo_id)"""
+    with obter_conexao() as conn:
+        c = conn.cursor()
+        c.execute('''
+            UPDATE tarefas_extracao
+            SET status = 'executando', tentativas = tentativas + 1, atualizado_em = CURRENT_TIMESTAMP
+            WHERE id = (
+                SELECT id FROM tarefas_extracao
+                WHERE status = 'pendente' AND proxima_tentativa_em <= CURRENT_TIMESTAMP
+                ORDER BY id
+                LIMIT 1
+            )
+            RETURNING id, anexo_id
+        ''')
+        tarefa = c.fetchone()
+        conn.commit()
+        return tarefa
+
+def concluir_tarefa_extracao(tarefa_id, hash_arquivo=None, texto=None):
+    with obter_conexao() as conn:
+        c = conn.cursor()
+        if hash_arquivo and texto is not None:
+            c.execute('''
+                INSERT OR IGNORE INTO textos_anexos (hash_arquivo, texto) VALUES (?, ?)
+            ''', (hash_arquivo, texto))
+        c.execute('''
+            UPDATE tarefas_extracao SET status = 'concluida', erro = NULL, atualizado_em = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (tarefa_id,))
+        conn.commit()
+
+def falhar_tarefa_extracao(tarefa_id, erro, definitiva=False):
+    """Registrar a falha; a tarefa volta para a fila com espera crescente até MAX_TENTATIVAS_EXTRACAO"""
+    with obter_conexao() as conn:
+        c = conn.cursor()
+        c.execute('''
+            UPDATE tarefas_extracao
+            SET status = CASE WHEN ? OR tentativas >= ? THEN 'falhou' ELSE 'pendente' END,
+                erro = ?,
+                proxima_tentativa_em = DATETIME('now', '+' || (? * (1 << tentativas)) || ' seconds'),
+                atualizado_em = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (definitiva, MAX_TENTATIVAS_EXTRACAO, str(erro), ESPERA_BASE_NOVA_TENTATIVA_SEGUNDOS, tarefa_id))
+        conn.commit()
+
+def devolver_tarefa_extracao(tarefa_id):
+    """Devolver à fila uma tarefa interrompida sem culpa dela, sem gastar uma tentativa"""
+    with obter_conexao() as conn:
+        c = conn.cursor()
+        c.execute('''
+            UPDATE tarefas_extracao
+            SET status = 'pendente', tentativas = MAX(tentativas - 1, 0), atualizado_em = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (tarefa_id,))
+        conn.commit()
+
+def reenfileirar_tarefas_extracao():
+    """Devolver à fila as tarefas que esgotaram as tentativas"""
+    with obter_conexao() as conn:
+        c = conn.cursor()
+        c.execute('''
+            UPDATE tarefas_extracao
+            SET status = 'pendente', tentativas = 0, proxima_tentativa_em = CURRENT_TIMESTAMP
+            WHERE status = 'falhou'
+        ''')
+        conn.commit()
+        return c.rowcount
+
+def recuperar_tarefas_travadas():
+    """Devolver à fila tarefas 'executando' abandonadas (por exemplo, após o servidor reiniciar)"""
+    with obter_conexao() as conn:
+        c = conn.cursor()
+        c.execute(f'''
+            UPDATE tarefas_extracao
+            SET status = 'pendente', atualizado_em = CURRENT_TIMESTAMP
+            WHERE status = 'executando'
+              AND atualizado_em < DATETIME('now', '-{TAREFA_TRAVADA_MINUTOS} minutes')
+        ''')
+        conn.commit()
+
+def obter_resumo_fila_extracao():
+    with obter_conexao() as conn:
+        c = conn.cursor()
+        c.execute('SELECT status, COUNT(*) FROM tarefas_extracao GROUP BY status')
+        return dict(c.fetchall())
+
+def _preparar_tarefa_extracao(anexo_id):
+    """Retorna (hash_arquivo, nome_arquivo, origem) ou None se não há nada a extrair.
+    
+    origem é o caminho local do conteúdo ou, se o armazenamento não tiver um, os bytes.
+    """
+    with obter_conexao() as conn:
+        c = conn.cursor()
+        c.execute('''
+            SELECT a.nome_arquivo, a.hash_arquivo, t.id
+            FROM anexos_arquivos a
+            LEFT JOIN textos_anexos t ON t.hash_arquivo = a.hash_arquivo
+            WHERE a.id = ?
+        ''', (anexo_id,))
+        linha = c.fetchone()
+        if not linha or not linha[1] or linha[2] is not None:
+            return None  # Anexo removido, sem hash ou conteúdo já indexado
+        nome_arquivo, hash_arquivo, _ = linha
+        if extracao_texto.tipo_do_arquivo(nome_arquivo) not in extracao_texto.TIPOS_SUPORTADOS:
+            return None
+    
+        origem = obter_armazenamento_anexos().caminho_local(hash_arquivo)
+        if origem is None:
+            origem = obter_dados_anexo(anexo_id)
+        return hash_arquivo, nome_arquivo, str(origem) if isinstance(origem, Path) else origem
+
+def _submeter_extracao(executor, processos, nome_arquivo, origem):
+    """Enviar a extração ao pool; PDFs grandes são divididos em intervalos de páginas.
+    
+    Retorna a lista de futuros, cujos textos devem ser unidos na ordem.
+    """
+    if extracao_texto.tipo_do_arquivo(nome_arquivo) == 'pdf' and processos > 1:
+        intervalos = extracao_texto.dividir_paginas(extracao_texto.contar_paginas_pdf(origem), processos)
+        return [
+            executor.submit(extracao_texto.extrair_paginas_pdf, origem, inicio, fim)
+            for inicio, fim in intervalos
+        ]
+    return [executor.submit(extracao_texto.extrair_texto_de_origem, origem, nome_arquivo)]
+
+def _criar_pool_extracao(processos):
+    # 'spawn' evita fazer fork de um processo com várias threads (o servidor do Streamlit)
+    return ProcessPoolExecutor(max_workers=processos, mp_context=multiprocessing.get_context('spawn'))
+
+def _devolver_tarefas_pool_quebrado(tarefa_ids, quebras):
+    """Devolver à fila as tarefas interrompidas pela queda de um processo do pool.
+    
+    Com várias tarefas em execução não se sabe qual derrubou o processo: todas voltam
+    sem gastar tentativa. Com uma só, a culpa é dela; em MAX_TENTATIVAS_EXTRACAO quedas
+    ela falha de vez (um PDF que derruba o PyMuPDF não pode derrubar o pool para sempre).
+    """
+    if len(tarefa_ids) == 1:
+        tarefa_id, = tarefa_ids
+        quebras[tarefa_id] = quebras.get(tarefa_id, 0) + 1
+        if quebras[tarefa_id] >= MAX_TENTATIVAS_EXTRACAO:
+            del quebras[tarefa_id]
+            falhar_tarefa_extracao(tarefa_id, "O processo de extração terminou inesperadamente", definitiva=True)
+            return
+    for tarefa_id in tarefa_ids:
+        devolver_tarefa_extracao(tarefa_id)
+
+def executar_fila_extracao(evento_parada, processos=PROCESSOS_EXTRACAO):
+    """Laço do trabalhador: reserva tarefas e as extrai num pool de processos.
+    
+    Se um processo do pool morrer (falha do PyMuPDF, falta de memória...), o pool
+    inteiro fica inutilizável (BrokenProcessPool): as tarefas em andamento voltam
+    para a fila, um novo pool é criado e as tarefas seguem uma de cada vez até uma
+    terminar, para achar a culpada.
+    """
+    recuperar_tarefas_travadas()
+    executor = _criar_pool_extracao(processos)
+    em_andamento = {}  # futuro -> tarefa (uma tarefa pode ter vários futuros, um por intervalo de páginas)
+    quebras = {}  # tarefa_id -> quedas do pool com só ela em execução
+    concorrencia = processos
     try:
-        arquivo.seek(0)
-        doc = Document(arquivo)
-        texto = ""
-        for paragrafo in doc.paragraphs:
-            if paragrafo.text:
-                texto += paragrafo.text + "\n"
-        return texto
-    except Exception as e:
-        st.error(f"Erro na extração de Word: {e}")
-        return ""
+        while not evento_parada.is_set():
+            pool_quebrado = []  # Tarefas interrompidas, se o pool quebrou nesta volta
+            # Manter no máximo uma parte de tarefa por processo em execução
+            while len(em_andamento) < concorrencia:
+                tarefa = reservar_tarefa_extracao()
+                if tarefa is None:
+                    break
+                tarefa_id, anexo_id = tarefa
+                try:
+                    preparada = _preparar_tarefa_extracao(anexo_id)
+                    if preparada is None:
+                        concluir_tarefa_extracao(tarefa_id)
+                        continue
+                    hash_arquivo, nome_arquivo, origem = preparada
+                    texto = obter_texto_em_cache(hash_arquivo)
+                    if texto is not None:
+                        concluir_tarefa_extracao(tarefa_id, hash_arquivo, texto)
+                        continue
+                    futuros = _submeter_extracao(executor, processos, nome_arquivo, origem)
+                except BrokenProcessPool:
+                    pool_quebrado.append(tarefa_id)
+                    break
+                except Exception as e:
+                    falhar_tarefa_extracao(tarefa_id, e)
+                    continue
+                dados_tarefa = {'id': tarefa_id, 'hash': hash_arquivo, 'futuros': futuros}
+                for futuro in futuros:
+                    em_andamento[futuro] = dados_tarefa
+            
+            if em_andamento and not pool_quebrado:
+                concluidos, _ = wait(em_andamento, timeout=INTERVALO_FILA_EXTRACAO_SEGUNDOS, return_when=FIRST_COMPLETED)
+                if any(isinstance(futuro.exception(), BrokenProcessPool) for futuro in concluidos):
+                    pool_quebrado.append(None)
+                else:
+                    for futuro in concluidos:
+                        dados_tarefa = em_andamento.pop(futuro)
+                        if any(f in em_andamento for f in dados_tarefa['futuros']):
+                            continue  # Ainda há intervalos de páginas desta tarefa em execução
+                        try:
+                            texto = "".join(f.result() for f in dados_tarefa['futuros'])
+                            gravar_texto_em_cache(dados_tarefa['hash'], texto)
+                            concluir_tarefa_extracao(dados_tarefa['id'], dados_tarefa['hash'], texto)
+                        except Exception as e:
+                            falhar_tarefa_extracao(dados_tarefa['id'], e)
+                        quebras.pop(dados_tarefa['id'], None)
+                        concorrencia = processos
+            elif not em_andamento and not pool_quebrado:
+                evento_parada.wait(INTERVALO_FILA_EXTRACAO_SEGUNDOS)
+            
+            if pool_quebrado:
+                tarefa_ids = {dados_tarefa['id'] for dados_tarefa in em_andamento.values()}
+                tarefa_ids.update(tarefa_id for tarefa_id in pool_quebrado if tarefa_id is not None)
+                _devolver_tarefas_pool_quebrado(tarefa_ids, quebras)
+                concorrencia = 1
+                em_andamento.clear()
+                executor.shutdown(wait=False, cancel_futures=True)
+                executor = _criar_pool_extracao(processos)
+    finally:
+        executor.shutdown()
 
-def processar_arquivo_enviado(arquivo):
-    """Processar arquivo enviado e retornar conteúdo de texto"""
-    tipo_arquivo = arquivo.name.split('.')[-1].lower()
-    
-    if tipo_arquivo == 'pdf':
-        return extrair_texto_de_pdf(arquivo)
-    elif tipo_arquivo in ['docx', 'doc']:
-        return extrair_texto_de_word(arquivo)
-    elif tipo_arquivo == 'txt':
-        return arquivo.read().decode('utf-8')
-    else:
-        return "Tipo de arquivo não suportado"
+@st.cache_resource(show_spinner=False)
+def iniciar_trabalhador_extracao(caminho_bd):
+    """Iniciar uma única thread de extração por processo e banco de dados"""
+    evento_parada = threading.Event()
+    thread = threading.Thread(
+        target=executar_fila_extracao, args=(evento_parada,),
+        name="trabalhador-extracao", daemon=True
+    )
+    thread.start()
+    return evento_parada
+
+def buscar_texto_anexos(termos, usuario_id, is_admin, problema_id=None, submetido_por=None, status=None,
+                        limite=20):
+    """Buscar no texto indexado dos anexos, ordenado por relevância (bm25).
+    
+    Anexos podem conter dados do solicitante: quem não é admin só busca nos
+    anexos dos próprios tickets (filtro aplicado no SQL); status restringe aos
+    tickets com esses status. Retorna tuplas (anexo_id, problema_id, ticket_id,
+    nome_arquivo, relevancia, trecho).
+    """
+    consulta = montar_consulta_fts(termos)
+    if consulta is None:
+        return []
+    
+    with obter_conexao() as conn:
+        c = conn.cursor()
+    
+        filtros = []
+        parametros = [consulta]
+        if not is_admin:
+            filtros.append('AND p.submetido_por = ?')
+            parametros.append(usuario_id)
+        if problema_id is not None:
+            filtros.append('AND a.problema_id = ?')
+            parametros.append(problema_id)
+        if submetido_por is not None:
+            filtros.append('AND p.submetido_por = ?')
+            parametros.append(submetido_por)
+        if status:
+            filtros.append(f"AND p.status IN ({', '.join('?' * len(status))})")
+            parametros.extend(status)
+        c.execute(f'''
+            SELECT a.id, a.problema_id, p.ticket_id, a.nome_arquivo,
+                   bm25(textos_anexos_fts) as relevancia,
+                   snippet(textos_anexos_fts, 0, '**', '**', '…', 16) as trecho
+            FROM textos_anexos_fts
+            JOIN textos_anexos t ON t.id = textos_anexos_fts.rowid
+            JOIN anexos_arquivos a ON a.hash_arquivo = t.hash_arquivo
+            JOIN problemas p ON p.id = a.problema_id
+            WHERE textos_anexos_fts MATCH ? {' '.join(filtros)}
+            ORDER BY relevancia
+            LIMIT ?
+        ''', parametros + [limite])
+    
+        return c.fetchall()
 
 # Atualizar status do problema
 def atualizar_status_problema(problema_id, novo_status, solucao=None):
-    conn = sqlite3.connect('sistema_suporte.db')
-    c = conn.cursor()
+    with obter_conexao() as conn:
+        c = conn.cursor()
     
-    if novo_status == 'resolvido' and solucao:
-        c.execute('''
-            UPDATE problemas 
-            SET status = ?, solucao = ?, resolvido_em = CURRENT_TIMESTAMP 
-            WHERE id = ?
-        ''', (novo_status, solucao, problema_id))
-    else:
-        c.execute('UPDATE problemas SET status = ? WHERE id = ?', (novo_status, problema_id))
+        if novo_status == 'resolvido' and solucao:
+            c.execute('''
+                UPDATE problemas 
+                SET status = ?, solucao = ?, resolvido_em = CURRENT_TIMESTAMP 
+                WHERE id = ?
+            ''', (novo_status, solucao, problema_id))
+        else:
+            c.execute('UPDATE problemas SET status = ? WHERE id = ?', (novo_status, problema_id))
     
-    conn.commit()
-    conn.close()
+        conn.commit()
 
 # Obter todos os usuários para atribuição
 def obter_todos_usuarios():
-    conn = sqlite3.connect('sistema_suporte.db')
-    c = conn.cursor()
-    c.execute('SELECT id, nome, email, perfil, criado_em FROM usuarios')
-    usuarios = c.fetchall()
-    conn.close()
-    return usuarios
+    with obter_conexao() as conn:
+        c = conn.cursor()
+        c.execute('SELECT id, nome, email, perfil, criado_em FROM usuarios')
+        usuarios = c.fetchall()
+        return usuarios
+
+# Estatísticas de tickets lidas da tabela materializada estatisticas_tickets
+def obter_estatisticas_problemas(usuario_id=None):
+    """Contagens para os cartões de métricas e os histogramas.
+    
+    Retorna um dicionário com 'total', 'por_status', 'por_prioridade',
+    'por_categoria', 'submetidos_usuario' e 'atribuidos_usuario' (estes dois
+    para usuario_id).
+    """
+    with obter_conexao() as conn:
+        c = conn.cursor()
+    
+        c.execute('''
+            SELECT dimensao, valor, contagem
+            FROM estatisticas_tickets
+            WHERE contagem > 0 AND (
+                dimensao IN ('total', 'status', 'prioridade', 'categoria')
+                OR (dimensao IN ('submetido_por', 'atribuido_para') AND valor = ?)
+            )
+        ''', (usuario_id,))
+    
+        estatisticas = {
+            'total': 0,
+            'por_status': {},
+            'por_prioridade': {},
+            'por_categoria': {},
+            'submetidos_usuario': 0,
+            'atribuidos_usuario': 0
+        }
+        for dimensao, valor, contagem in c.fetchall():
+            if dimensao == 'total':
+                estatisticas['total'] = contagem
+            elif dimensao == 'submetido_por':
+                estatisticas['submetidos_usuario'] = contagem
+            elif dimensao == 'atribuido_para':
+                estatisticas['atribuidos_usuario'] = contagem
+            else:
+                estatisticas[f'por_{dimensao}'][valor] = contagem
+    
+        return estatisticas
+
+def contar_usuarios():
+    with obter_conexao() as conn:
+        c = conn.cursor()
+        c.execute('SELECT COUNT(*) FROM usuarios')
+        return c.fetchone()[0]
 
 # Mapeamento de prioridade para ordenação
 ORDEM_PRIORIDADE = {'Crítico': 1, 'Alta': 2, 'Média': 3, 'Baixa': 4}
 
+# Navegação entre páginas: a pilha de cursores de cada lista fica no estado da sessão
+def cursor_pagina_atual(chave):
+    historico = st.session_state.setdefault(f"cursores_{chave}", [None])
+    return historico[-1]
+
+def controles_paginacao(chave, proximo_cursor):
+    historico = st.session_state.setdefault(f"cursores_{chave}", [None])
+    
+    col1, col2, col3 = st.columns([1, 1, 4])
+    with col1:
+        if st.button("⬅️ Anterior", key=f"anterior_{chave}", disabled=len(historico) == 1):
+            historico.pop()
+            st.rerun()
+    with col2:
+        if st.button("Próxima ➡️", key=f"proxima_{chave}", disabled=proximo_cursor is None):
+            historico.append(proximo_cursor)
+            st.rerun()
+    with col3:
+        st.caption(f"Página {len(historico)}")
+
+# Caixa de busca textual exibida no topo das páginas de tickets
+def mostrar_busca_tickets(chave, usuario, submetido_por=None, status=None):
+    termos = st.text_input("🔎 Buscar tickets", placeholder="Palavras do título, descrição ou solução...",
+                           key=f"busca_tickets_{chave}")
+    if not termos:
+        return
+    
+    is_admin = usuario['perfil'] == 'admin'
+    resultados = buscar_tickets(termos, usuario['id'], is_admin, submetido_por=submetido_por, status=status)
+    resultados_anexos = buscar_texto_anexos(termos, usuario['id'], is_admin, submetido_por=submetido_por,
+                                            status=status)
+    if not resultados and not resultados_anexos:
+        st.info("Nenhum ticket encontrado para esta busca.")
+    for resultado in resultados:
+        st.markdown(f"**{resultado[1]} - {resultado[2]}** [{resultado[4]}] - {resultado[3]}  \n{resultado[6]}")
+    if resultados_anexos:
+        st.write("**Encontrado nos anexos:**")
+        for resultado in resultados_anexos:
+            st.markdown(f"📎 **{resultado[2]} - {resultado[3]}**  \n{resultado[5]}")
+    st.markdown("---")
+
 def main():
     st.set_page_config(page_title="Plataforma de Resolução de Problemas", page_icon="🔧", layout="wide")
     
-    # Inicializar banco de dados
-    init_db()
+    # Inicializar banco de dados (executa as migrações apenas uma vez por processo)
+    init_db_uma_vez(CAMINHO_BD, VERSAO_SCHEMA)
+    iniciar_trabalhador_extracao(CAMINHO_BD)
     
     # Barra lateral para navegação
     st.sidebar.title("🔧 Plataforma de Resolução de Problemas")
@@ -628,7 +2281,7 @@ def main():
         
         # Mostrar problemas recentes (somente leitura para usuários não logados)
         st.subheader("📋 Problemas Submetidos Recentemente")
-        problemas = obter_todos_problemas()
+        problemas, _ = obter_pagina_problemas()
         if problemas:
             dados_problemas = []
             for problema in problemas:
@@ -693,18 +2346,17 @@ def mostrar_pagina_inicio(usuario):
     col1, col2, col3, col4 = st.columns(4)
     
     # Estatísticas
-    problemas = obter_todos_problemas()
-    problemas_usuario = obter_problemas_usuario(usuario['id'])
-    atribuicoes = len([p for p in problemas if p[10] == usuario['id']])
+    estatisticas = obter_estatisticas_problemas(usuario['id'])
+    por_status = estatisticas['por_status']
     
     with col1:
-        st.metric("Total de Tickets", len(problemas))
+        st.metric("Total de Tickets", estatisticas['total'])
     with col2:
-        st.metric("Meus Tickets Submetidos", len(problemas_usuario))
+        st.metric("Meus Tickets Submetidos", estatisticas['submetidos_usuario'])
     with col3:
-        st.metric("Minhas Atribuições", atribuicoes)
+        st.metric("Minhas Atribuições", estatisticas['atribuidos_usuario'])
     with col4:
-        st.metric("Tickets Abertos", len([p for p in problemas if p[6] in ['aberto', 'em andamento']]))
+        st.metric("Tickets Abertos", por_status.get('aberto', 0) + por_status.get('em andamento', 0))
     
     st.markdown("---")
     
@@ -712,7 +2364,7 @@ def mostrar_pagina_inicio(usuario):
     st.subheader("📈 Atividade Recente")
     
     # Problemas recentes
-    problemas_recentes = problemas[:5]
+    problemas_recentes, _ = obter_pagina_problemas(tamanho_pagina=5)
     if problemas_recentes:
         st.write("**Tickets Submetidos Recentemente:**")
         for problema in problemas_recentes:
@@ -761,14 +2413,17 @@ def mostrar_submeter_ticket(usuario):
                 # Salvar arquivos enviados
                 if arquivos_enviados:
                     for arquivo_enviado in arquivos_enviados:
-                        dados_arquivo = arquivo_enviado.read()
-                        salvar_anexo_arquivo(
+                        # O arquivo é copiado em blocos para o armazenamento de anexos
+                        arquivo_enviado.seek(0)
+                        anexo_id = salvar_anexo_arquivo(
                             problema_id, 
                             arquivo_enviado.name, 
-                            dados_arquivo, 
+                            arquivo_enviado, 
                             arquivo_enviado.type, 
                             usuario['id']
                         )
+                        # O texto é extraído e indexado em segundo plano
+                        enfileirar_extracao_anexo(anexo_id)
                     st.info(f"📎 {len(arquivos_enviados)} arquivo(s) anexado(s)")
                 
                 # Adicionar evento inicial do calendário para o prazo
@@ -786,7 +2441,11 @@ def mostrar_submeter_ticket(usuario):
 def mostrar_meus_tickets(usuario):
     st.title("📋 Meus Tickets Submetidos")
     
-    problemas = obter_problemas_usuario(usuario['id'])
+    mostrar_busca_tickets("meus_tickets", usuario, submetido_por=usuario['id'])
+    
+    problemas, proximo_cursor = obter_pagina_problemas(
+        cursor_pagina_atual("meus_tickets"), submetido_por=usuario['id']
+    )
     
     if not problemas:
         st.info("Você não submeteu nenhum ticket ainda.")
@@ -816,16 +2475,23 @@ def mostrar_meus_tickets(usuario):
                     for anexo in anexos:
                         col_a1, col_a2 = st.columns([3, 1])
                         with col_a1:
-                            st.write(f"📎 {anexo[2]}")
+                            st.write(f"📎 {anexo[2]} ({formatar_tamanho(anexo[3])}) - {anexo[7]}")
                         with col_a2:
-                            dados_arquivo = anexo[3]
-                            st.download_button(
-                                label="Baixar",
-                                data=dados_arquivo,
-                                file_name=anexo[2],
-                                mime=anexo[4],
-                                key=f"dl_{anexo[0]}"
-                            )
+                            # O conteúdo só é lido do banco depois que o usuário pede o download, e
+                            # uma vez só: o pedido é consumido aqui, e o próximo rerun volta a "Preparar"
+                            chave_download = f"preparar_dl_{anexo[0]}"
+                            if st.session_state.pop(chave_download, False):
+                                with abrir_anexo(anexo[0]) as arquivo_anexo:
+                                    st.download_button(
+                                        label="Baixar",
+                                        data=arquivo_anexo,
+                                        file_name=anexo[2],
+                                        mime=anexo[4],
+                                        key=f"dl_{anexo[0]}"
+                                    )
+                            elif st.button("Preparar", key=f"btn_{chave_download}"):
+                                st.session_state[chave_download] = True
+                                st.rerun()
                 
                 # Mostrar resultados de busca
                 resultados_busca = obter_resultados_busca(problema[0])
@@ -846,22 +2512,23 @@ def mostrar_meus_tickets(usuario):
                     data_hora_evento = datetime.combine(data_evento, hora_evento)
                     adicionar_evento_calendario(problema[0], titulo_evento, desc_evento, data_hora_evento, usuario['id'])
                     st.success("Evento adicionado ao calendário!")
+    
+    controles_paginacao("meus_tickets", proximo_cursor)
 
 def mostrar_tickets_disponiveis(usuario):
     st.title("🔍 Tickets Disponíveis para Resolução")
     
-    problemas = obter_todos_problemas()
+    mostrar_busca_tickets("tickets_disponiveis", usuario, status=('aberto', 'em andamento'))
     
-    # Filtrar problemas que não estão atribuídos ao usuário atual e ainda estão abertos
-    problemas_disponiveis = [p for p in problemas if p[10] != usuario['id'] and p[6] in ['aberto', 'em andamento']]
+    # Tickets abertos não atribuídos ao usuário atual, já ordenados por prioridade
+    problemas_disponiveis, proximo_cursor = obter_pagina_problemas_disponiveis(
+        usuario['id'], cursor_pagina_atual("tickets_disponiveis")
+    )
     
     if not problemas_disponiveis:
         st.info("Nenhum ticket disponível no momento.")
         return
     
-    # Ordenar por prioridade
-    problemas_disponiveis.sort(key=lambda x: ORDEM_PRIORIDADE.get(x[5], 5))
-    
     for problema in problemas_disponiveis:
         with st.expander(f"{problema[1]} - {problema[2]} [{problema[5]}] - {problema[6]}"):
             col1, col2 = st.columns([3, 1])
@@ -877,11 +2544,10 @@ def mostrar_tickets_disponiveis(usuario):
                 st.write(problema[3])
                 
                 # Mostrar atribuições atuais
-                atribuicoes = obter_atribuicoes_problema(problema[0])
-                if atribuicoes:
+                if problema[15]:
                     st.write("**Atualmente atribuído a:**")
-                    for atribuicao in atribuicoes:
-                        st.write(f"- {atribuicao[4]}")
+                    for nome_atribuido in problema[15].split(', '):
+                        st.write(f"- {nome_atribuido}")
             
             with col2:
                 if st.button(f"Atribuir a Mim", key=f"atribuir_{problema[0]}"):
@@ -890,6 +2556,8 @@ def mostrar_tickets_disponiveis(usuario):
                         st.rerun()
                     else:
                         st.error("Falha na atribuição!")
+    
+    controles_paginacao("tickets_disponiveis", proximo_cursor)
 
 def mostrar_todos_tickets(usuario):
     if usuario['perfil'] != 'admin':
@@ -898,7 +2566,9 @@ def mostrar_todos_tickets(usuario):
     
     st.title("📊 Todos os Tickets (Visualização Admin)")
     
-    problemas = obter_todos_problemas()
+    mostrar_busca_tickets("todos_tickets", usuario)
+    
+    problemas, proximo_cursor = obter_pagina_problemas(cursor_pagina_atual("todos_tickets"))
     
     if not problemas:
         st.info("Nenhum ticket submetido ainda.")
@@ -907,8 +2577,7 @@ def mostrar_todos_tickets(usuario):
     # Criar DataFrame para melhor exibição
     dados_problemas = []
     for problema in problemas:
-        atribuicoes = obter_atribuicoes_problema(problema[0])
-        atribuido_a = ", ".join([a[4] for a in atribuicoes]) if atribuicoes else "Nenhum"
+        atribuido_a = problema[15] or "Nenhum"
         
         dados_problemas.append({
             'ID do Ticket': problema[1],
@@ -924,8 +2593,9 @@ def mostrar_todos_tickets(usuario):
     
     df = pd.DataFrame(dados_problemas)
     st.dataframe(df, use_container_width=True)
+    controles_paginacao("todos_tickets", proximo_cursor)
     
-    # Gerenciamento de tickets
+    # Gerenciamento de tickets (tickets da página atual)
     st.subheader("Gerenciamento de Tickets")
     ids_problemas = [p[0] for p in problemas]
     problema_selecionado = st.selectbox("Selecionar Ticket para Gerenciar", ids_problemas, 
@@ -973,7 +2643,18 @@ def mostrar_todos_tickets(usuario):
             anexos = obter_anexos_arquivos(problema_selecionado)
             if anexos:
                 for anexo in anexos:
-                    st.write(f"📎 {anexo[2]}")
+                    st.write(f"📎 {anexo[2]} ({formatar_tamanho(anexo[3])})")
+                
+                termos_anexos = st.text_input("Buscar no conteúdo dos anexos", key="busca_anexos_ticket")
+                if termos_anexos:
+                    resultados_anexos = buscar_texto_anexos(
+                        termos_anexos, usuario['id'], usuario['perfil'] == 'admin', problema_id=problema_selecionado
+                    )
+                    if resultados_anexos:
+                        for resultado in resultados_anexos:
+                            st.markdown(f"**{resultado[3]}**  \n{resultado[5]}")
+                    else:
+                        st.write("Nenhuma ocorrência nos anexos")
             else:
                 st.write("Nenhum anexo")
 
@@ -1063,26 +2744,22 @@ def mostrar_painel_admin(usuario):
     with aba2:
         st.subheader("Estatísticas do Sistema")
         
-        problemas = obter_todos_problemas()
-        usuarios = obter_todos_usuarios()
+        estatisticas = obter_estatisticas_problemas()
         
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            st.metric("Total de Tickets", len(problemas))
+            st.metric("Total de Tickets", estatisticas['total'])
         with col2:
-            st.metric("Total de Usuários", len(usuarios))
+            st.metric("Total de Usuários", contar_usuarios())
         with col3:
-            st.metric("Em Andamento", len([p for p in problemas if p[6] == 'em andamento']))
+            st.metric("Em Andamento", estatisticas['por_status'].get('em andamento', 0))
         with col4:
-            st.metric("Resolvidos", len([p for p in problemas if p[6] == 'resolvido']))
+            st.metric("Resolvidos", estatisticas['por_status'].get('resolvido', 0))
         
         # Distribuição de prioridade
         st.subheader("Distribuição de Prioridade")
-        contagens_prioridade = {}
-        for problema in problemas:
-            prioridade = problema[5]
-            contagens_prioridade[prioridade] = contagens_prioridade.get(prioridade, 0) + 1
+        contagens_prioridade = estatisticas['por_prioridade']
         
         if contagens_prioridade:
             df_prioridade = pd.DataFrame(list(contagens_prioridade.items()), columns=['Prioridade', 'Contagem'])
@@ -1091,6 +2768,50 @@ def mostrar_painel_admin(usuario):
     with aba3:
         st.subheader("Gerenciamento do Banco de Dados")
         
+        if st.button("Reconstruir Estatísticas"):
+            reconstruir_estatisticas()
+            st.success("Estatísticas recalculadas a partir dos tickets!")
+        
+        if st.button("Compactar Banco de Dados (VACUUM)"):
+            compactar_banco()
+            st.success("Banco de dados compactado!")
+        
+        st.write("**Cache de Buscas na Web:**")
+        contadores = obter_contadores_cache()
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Acertos", contadores.get('busca_acerto', 0))
+        with col2:
+            st.metric("Acertos Obsoletos", contadores.get('busca_obsoleta', 0))
+        with col3:
+            st.metric("Falhas", contadores.get('busca_falha', 0))
+        motores = pd.DataFrame(
+            obter_despachante_busca().obter_estado(), columns=['Provedor', 'Disjuntor', 'Latência p95 (s)']
+        )
+        st.dataframe(motores, use_container_width=True, hide_index=True)
+        st.write("**Acesso a Sites Externos (por host):**")
+        metricas_hosts = cliente_http.obter_metricas_limitador()
+        if metricas_hosts:
+            st.dataframe(pd.DataFrame(metricas_hosts).rename(columns={
+                'host': 'Host', 'requisicoes': 'Requisições', 'recusadas': 'Recusadas (fila cheia)',
+                'bloqueadas_robots': 'Bloqueadas (robots.txt)',
+                'espera_media_s': 'Espera Média na Fila (s)', 'espera_maxima_s': 'Espera Máxima (s)'
+            }), use_container_width=True, hide_index=True)
+        else:
+            st.info("Nenhum acesso externo desde que o servidor foi iniciado.")
+        if st.button("Limpar Cache de Buscas"):
+            removidas = limpar_cache_buscas()
+            st.success(f"{removidas} busca(s) removida(s) do cache.")
+        
+        st.write("**Cache de Páginas Extraídas:**")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Acertos", contadores.get('pagina_acerto', 0))
+        with col2:
+            st.metric("Revalidadas (304)", contadores.get('pagina_revalidada', 0))
+        with col3:
+            st.metric("Downloads Completos", contadores.get('pagina_falha', 0))
+        
         if st.button("Exportar Dados para CSV"):
             # Exportar problemas
             problemas = obter_todos_problemas()
@@ -1122,6 +2843,34 @@ def mostrar_painel_admin(usuario):
     with aba4:
         st.subheader("Gerenciamento de Arquivos")
         st.info("Os anexos de arquivos são gerenciados dentro dos tickets individuais.")
+        
+        resumo = obter_resumo_armazenamento_anexos()
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Anexos", resumo['total_anexos'])
+        with col2:
+            st.metric("Arquivos Únicos", resumo['conteudos_unicos'])
+        with col3:
+            st.metric("Espaço Economizado", formatar_tamanho(resumo['bytes_economizados']))
+        
+        st.write("**Extração de Texto dos Anexos:**")
+        fila = obter_resumo_fila_extracao()
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Pendentes", fila.get('pendente', 0))
+        with col2:
+            st.metric("Executando", fila.get('executando', 0))
+        with col3:
+            st.metric("Concluídas", fila.get('concluida', 0))
+        with col4:
+            st.metric("Falharam", fila.get('falhou', 0))
+        if st.button("Reprocessar Falhas"):
+            reprocessadas = reenfileirar_tarefas_extracao()
+            st.success(f"{reprocessadas} tarefa(s) devolvida(s) à fila.")
+        
+        if st.button("Limpar Arquivos Órfãos"):
+            removidos = limpar_conteudos_orfaos()
+            st.success(f"{removidos} arquivo(s) sem referência removido(s) do armazenamento.")
 
 # BUSCA NA WEB MELHORADA
 def mostrar_busca_web(usuario):
@@ -1144,55 +2893,102 @@ def mostrar_busca_web(usuario):
             key="ticket_associado"
         )
         
+        pre_carregar = st.checkbox(
+            "⚡ Pré-carregar as páginas dos primeiros resultados", value=True, key="pre_carregar_paginas",
+            help="Começa a extrair o conteúdo dos primeiros resultados em segundo plano, logo após a busca."
+        )
+        if not pre_carregar:
+            cancelar_pre_carregamento(st.session_state.pop('pre_carregamento', []))
+        
         if st.button("🔍 Buscar na Web", type="primary") and consulta_busca:
             with st.spinner("Buscando na web..."):
-                resultados = buscar_na_web(consulta_busca, max_resultados)
+                # Guardados na sessão para continuarem na tela quando outro botão for clicado
+                st.session_state.busca_web = {
+                    'consulta': consulta_busca,
+                    'resultados': buscar_na_web(consulta_busca, max_resultados)
+                }
+            # Uma nova busca cancela o pré-carregamento da anterior nesta sessão
+            cancelar_pre_carregamento(st.session_state.pop('pre_carregamento', []))
+            if pre_carregar:
+                urls = [
+                    resultado['href'] for resultado in st.session_state.busca_web['resultados']
+                    if resultado.get('href', '').startswith(('http://', 'https://'))
+                ]
+                st.session_state.pre_carregamento = pre_carregar_paginas(urls[:PRE_CARREGAR_RESULTADOS])
+        
+        busca_web = st.session_state.get('busca_web')
+        if busca_web:
+            consulta_busca = busca_web['consulta']
+            resultados = busca_web['resultados']
+            
+            if resultados:
+                st.success(f"✅ Encontrados {len(resultados)} resultados")
                 
-                if resultados:
-                    st.success(f"✅ Encontrados {len(resultados)} resultados")
-                    
-                    for i, resultado in enumerate(resultados):
-                        with st.expander(f"**{i+1}. {resultado.get('title', 'Sem título')}**"):
-                            st.write(f"**🌐 URL:** {resultado.get('href', 'N/A')}")
-                            st.write(f"**📝 Descrição:** {resultado.get('body', 'Sem descrição disponível.')}")
-                            
-                            col_s1, col_s2 = st.columns(2)
-                            with col_s1:
-                                if st.button(f"💾 Salvar Resultado", key=f"salvar_{i}"):
-                                    if problema_id:
-                                        try:
-                                            ticket_id = int(problema_id.split(' - ')[0])
-                                            salvar_resultado_busca(
-                                                ticket_id,
-                                                consulta_busca,
-                                                resultado.get('title', ''),
-                                                resultado.get('href', ''),
-                                                resultado.get('body', ''),
-                                                "DuckDuckGo"
-                                            )
-                                            st.success("✅ Resultado salvo no ticket!")
-                                        except Exception as e:
-                                            st.error(f"❌ Erro ao salvar: {str(e)}")
-                                    else:
-                                        st.error("❌ Por favor, selecione um ticket para salvar o resultado")
-                            
-                            with col_s2:
-                                if st.button(f"🔎 Extrair Conteúdo", key=f"extrair_{i}"):
-                                    url = resultado.get('href', '')
-                                    if url and url.startswith(('http://', 'https://')):
-                                        with st.spinner("Extraindo conteúdo da página..."):
-                                            conteudo = buscar_com_beautiful_soup(url)
-                                            if 'erro' not in conteudo:
-                                                st.success("✅ Conteúdo extraído com sucesso!")
-                                                st.write(f"**📖 Título:** {conteudo['titulo']}")
-                                                st.write("**📄 Conteúdo:**")
-                                                st.text_area("Conteúdo Extraído", conteudo['conteudo'], height=200, key=f"conteudo_{i}")
-                                            else:
-                                                st.error(f"❌ Extração falhou: {conteudo['erro']}")
-                                    else:
-                                        st.error("❌ URL inválida para extração")
-                else:
-                    st.warning("⚠️ Nenhum resultado encontrado. Tente outros termos de busca.")
+                for i, resultado in enumerate(resultados):
+                    with st.expander(f"**{i+1}. {resultado.get('title', 'Sem título')}**"):
+                        st.write(f"**🌐 URL:** {resultado.get('href', 'N/A')}")
+                        st.write(f"**📝 Descrição:** {resultado.get('body', 'Sem descrição disponível.')}")
+                        # Resultados guardados em cache antes da busca em vários provedores não têm 'motores'
+                        motores = ', '.join(resultado.get('motores', ['DuckDuckGo']))
+                        st.write(f"**🔎 Encontrado por:** {motores}")
+                        
+                        col_s1, col_s2 = st.columns(2)
+                        with col_s1:
+                            if st.button(f"💾 Salvar Resultado", key=f"salvar_{i}"):
+                                if problema_id:
+                                    try:
+                                        ticket_id = int(problema_id.split(' - ')[0])
+                                        salvar_resultado_busca(
+                                            ticket_id,
+                                            consulta_busca,
+                                            resultado.get('title', ''),
+                                            resultado.get('href', ''),
+                                            resultado.get('body', ''),
+                                            motores
+                                        )
+                                        st.success("✅ Resultado salvo no ticket!")
+                                    except Exception as e:
+                                        st.error(f"❌ Erro ao salvar: {str(e)}")
+                                else:
+                                    st.error("❌ Por favor, selecione um ticket para salvar o resultado")
+                        
+                        with col_s2:
+                            if st.button(f"🔎 Extrair Conteúdo", key=f"extrair_{i}"):
+                                url = resultado.get('href', '')
+                                if url and url.startswith(('http://', 'https://')):
+                                    with st.spinner("Extraindo conteúdo da página..."):
+                                        conteudo = extrair_pagina(url)
+                                        if 'erro' not in conteudo:
+                                            st.success("✅ Conteúdo extraído com sucesso!")
+                                            st.write(f"**📖 Título:** {conteudo['titulo']}")
+                                            st.write("**📄 Conteúdo:**")
+                                            st.text_area("Conteúdo Extraído", conteudo['conteudo'], height=200, key=f"conteudo_{i}")
+                                        else:
+                                            st.error(f"❌ Extração falhou: {conteudo['erro']}")
+                                else:
+                                    st.error("❌ URL inválida para extração")
+                
+                if st.button("⚡ Extrair Conteúdo de Todos", key="extrair_todos"):
+                    validos = [
+                        (i, resultado) for i, resultado in enumerate(resultados)
+                        if resultado.get('href', '').startswith(('http://', 'https://'))
+                    ]
+                    progresso = st.progress(0.0, text="Extraindo conteúdo das páginas...")
+                    # Um espaço reservado por resultado, na ordem da busca, preenchido quando a página termina
+                    espacos = [st.empty() for _ in validos]
+                    for concluidos, (indice, conteudo) in enumerate(
+                        extrair_paginas_em_paralelo([resultado['href'] for _, resultado in validos]), start=1
+                    ):
+                        i, resultado = validos[indice]
+                        with espacos[indice].container():
+                            st.write(f"**{i+1}. {resultado.get('title', 'Sem título')}**")
+                            if 'erro' not in conteudo:
+                                st.text_area("Conteúdo Extraído", conteudo['conteudo'], height=150, key=f"conteudo_todos_{i}")
+                            else:
+                                st.error(f"❌ Extração falhou: {conteudo['erro']}")
+                        progresso.progress(concluidos / len(validos), text=f"{concluidos} de {len(validos)} página(s) extraída(s)")
+            else:
+                st.warning("⚠️ Nenhum resultado encontrado. Tente outros termos de busca.")
     
     with aba2:
         st.subheader("📚 Resultados de Busca Salvos")
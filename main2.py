@@ -20,6 +20,7 @@ import fitz  # PyMuPDF - biblioteca alternativa para PDF
 from duckduckgo_search import DDGS
 #import google.generativeai as genai
 import os
+import cliente_http
 
 # Inicializar banco de dados com tabelas aprimoradas
 def init_db():
@@ -378,10 +379,7 @@ def buscar_na_web(consulta, max_resultados=5):
 def buscar_com_beautiful_soup(url):
     """Extrair conteúdo de uma URL usando BeautifulSoup"""
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
+        response = cliente_http.get(url, timeout=10)
         response.raise_for_status()  # Levanta exceção para erros HTTP
         
         soup = BeautifulSoup(response.content, 'html.parser')
@@ -962,17 +960,9 @@ def buscar_alternativa(consulta, max_resultados=5):
         consulta_codificada = urllib.parse.quote(consulta)
         url = f"https://html.duckduckgo.com/html/?q={consulta_codificada}"
         
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'DNT': '1',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        }
-        
-        response = requests.get(url, headers=headers, timeout=15)
+        # Cabeçalhos padrão e conexões keep-alive vêm da sessão compartilhada
+        # Busca a pedido do usuário: respeita o limite de taxa do host, mas não o robots.txt
+        response = cliente_http.get(url, headers={'Accept-Language': 'en-US,en;q=0.5', 'DNT': '1'}, timeout=15, respeitar_robots=False)
         soup = BeautifulSoup(response.content, 'html.parser')
         
         resultados = []
@@ -0,0 +1,153 @@
+# Testes da busca na web contra um servidor local que imita o HTML do DuckDuckGo:
+# hedging entre a API e o HTML, prazo da busca e disjuntores.
+import http.server
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+class ServidorStub(http.server.BaseHTTPRequestHandler):
+    """Responde como html.duckduckgo.com/html/; atraso e status são ajustados por teste"""
+    atraso = 0.0
+    status = 200
+    requisicoes = 0
+
+    def do_GET(self):
+        ServidorStub.requisicoes += 1
+        time.sleep(ServidorStub.atraso)
+        consulta = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query).get('q', [''])[0]
+        destino = urllib.parse.quote(f'https://exemplo.com/{consulta}', safe='')
+        corpo = (
+            f'<html><body><div class="result">'
+            f'<a class="result__a" href="//duckduckgo.com/l/?uddg={destino}">Resultado para {consulta}</a>'
+            f'<a class="result__snippet">Trecho sobre {consulta}</a>'
+            f'</div></body></html>'
+        ).encode()
+        try:
+            self.send_response(ServidorStub.status)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # O cliente desistiu (timeout)
+
+    def log_message(self, *args):
+        pass
+
+servidor = http.server.ThreadingHTTPServer(('127.0.0.1', 0), ServidorStub)
+servidor.daemon_threads = True
+threading.Thread(target=servidor.serve_forever, daemon=True).start()
+HOST_STUB = f'127.0.0.1:{servidor.server_address[1]}'
+
+# Lidas na importação do main
+os.environ['SISTEMA_SUPORTE_URL_BUSCA_HTML'] = f'http://{HOST_STUB}/html/'
+os.environ.setdefault('SISTEMA_SUPORTE_DB', str(Path(tempfile.mkdtemp()) / 'teste_busca.db'))
+
+import cliente_http  # noqa: E402
+import despacho_busca  # noqa: E402
+import main  # noqa: E402
+
+cliente_http.LIMITES_POR_HOST[HOST_STUB] = (1000, 1000, 16)
+
+@pytest.fixture(autouse=True)
+def stub():
+    ServidorStub.atraso = 0.0
+    ServidorStub.status = 200
+    ServidorStub.requisicoes = 0
+    return ServidorStub
+
+def api_lenta(espera):
+    def buscar(consulta, max_resultados, timeout):
+        time.sleep(min(espera, timeout))
+        return [{'title': 'API', 'href': 'https://exemplo.com/api', 'body': ''}]
+    return buscar
+
+def api_fora_do_ar(consulta, max_resultados, timeout):
+    raise ConnectionError('API fora do ar')
+
+def grupo_duckduckgo(funcao_api, p95_api=None):
+    api = despacho_busca.MotorBusca('DuckDuckGo', funcao_api)
+    if p95_api is not None:
+        for _ in range(despacho_busca.AMOSTRAS_MINIMAS_P95):
+            api.latencia.registrar(p95_api)
+    html = despacho_busca.MotorBusca('DuckDuckGo HTML', main.buscar_no_duckduckgo_html)
+    return despacho_busca.ProvedorEscalonado('Web', [api, html])
+
+def test_busca_html_le_o_servidor_configurado():
+    resultados = main.buscar_no_duckduckgo_html('impressora', max_resultados=5, timeout=5)
+    assert resultados == [{
+        'title': 'Resultado para impressora',
+        'href': 'https://exemplo.com/impressora',
+        'body': 'Trecho sobre impressora',
+    }]
+
+def test_html_so_e_disparado_quando_a_api_passa_do_p95(stub):
+    grupo = grupo_duckduckgo(api_lenta(0.01), p95_api=0.5)
+    resultados = grupo.buscar('rede', 5, timeout=5)
+    assert [r['motor'] for r in resultados] == ['DuckDuckGo']
+    assert stub.requisicoes == 0
+
+def test_hedge_usa_o_html_quando_a_api_demora(stub):
+    grupo = grupo_duckduckgo(api_lenta(3), p95_api=0.05)
+    inicio = time.monotonic()
+    resultados = grupo.buscar('rede', 5, timeout=5)
+    assert time.monotonic() - inicio < 1.5  # Não esperou a API
+    assert [(r['motor'], r['href']) for r in resultados] == [('DuckDuckGo HTML', 'https://exemplo.com/rede')]
+    assert stub.requisicoes == 1
+
+def test_prazo_limita_a_busca_com_o_servidor_lento(stub):
+    stub.atraso = 2
+    despachante = despacho_busca.DespachanteBusca([grupo_duckduckgo(api_fora_do_ar)], prazo=0.3)
+    inicio = time.monotonic()
+    resposta = despachante.buscar_em_todos('rede', 5)
+    assert time.monotonic() - inicio < 1.0
+    assert resposta['resultados'] == [] and not resposta['web_respondeu']
+    # O grupo e seus membros têm o mesmo prazo: qualquer um dos dois pode registrá-lo
+    assert 'prazo esgotado' in resposta['erros']['Web']
+
+def test_disjuntor_do_html_abre_com_o_servidor_fora_do_ar(stub):
+    stub.status = 404  # Fora da lista de novas tentativas: uma requisição por chamada
+    grupo = grupo_duckduckgo(api_fora_do_ar)
+    html = grupo.despachante.provedores[1]
+    for _ in range(despacho_busca.FALHAS_PARA_ABRIR):
+        with pytest.raises(RuntimeError, match='DuckDuckGo HTML'):
+            grupo.buscar('rede', 5, timeout=5)
+    assert html.disjuntor.estado == 'aberto'
+
+    requisicoes = stub.requisicoes
+    with pytest.raises(RuntimeError, match='DuckDuckGo HTML: disjuntor aberto'):
+        grupo.buscar('rede', 5, timeout=5)
+    assert stub.requisicoes == requisicoes  # O servidor não foi chamado de novo
+
+def test_fusao_registra_o_motor_que_respondeu_no_grupo():
+    base = despacho_busca.MotorBusca('Base', lambda consulta, maximo, timeout: [
+        {'title': 'Ticket', 'href': 'https://exemplo.com/rede/', 'body': ''},
+    ])
+    despachante = despacho_busca.DespachanteBusca([grupo_duckduckgo(api_fora_do_ar), base], prazo=5)
+    resposta = despachante.buscar_em_todos('rede', 5)
+    assert resposta['web_respondeu']
+    assert [(r['href'], r['motores']) for r in resposta['resultados']] == [
+        ('https://exemplo.com/rede', ['DuckDuckGo HTML', 'Base']),
+    ]
+    assert 'motor' not in resposta['resultados'][0]
+    nomes = [nome for nome, _, _ in despachante.obter_estado()]
+    assert nomes == ['Web', 'Web › DuckDuckGo', 'Web › DuckDuckGo HTML', 'Base']
+
+def test_buscar_na_web_guarda_no_cache_a_resposta_do_html(monkeypatch, stub):
+    main.init_db()
+    monkeypatch.setattr(main, 'buscar_no_duckduckgo', api_fora_do_ar)
+    despachante = despacho_busca.DespachanteBusca(main.criar_provedores_busca())
+    monkeypatch.setattr(main, 'obter_despachante_busca', lambda: despachante)
+
+    resultados = main.buscar_na_web('teclado sem resposta', max_resultados=5)
+    assert [r['motores'] for r in resultados] == [['DuckDuckGo HTML']]
+    assert main.buscar_na_web('teclado sem resposta', max_resultados=5) == resultados
+    assert stub.requisicoes == 1  # A segunda veio do cache
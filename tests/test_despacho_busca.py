@@ -0,0 +1,108 @@
+# Testes do despacho das buscas (despacho_busca): disjuntores, prazos e fusão.
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import despacho_busca  # noqa: E402
+
+class Relogio:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+def disjuntor_aberto(relogio):
+    disjuntor = despacho_busca.DisjuntorCircuito(falhas_para_abrir=2, tempo_aberto=30, relogio=relogio)
+    disjuntor.registrar_falha()
+    disjuntor.registrar_falha()
+    return disjuntor
+
+def test_disjuntor_abre_apos_falhas_seguidas():
+    relogio = Relogio()
+    disjuntor = despacho_busca.DisjuntorCircuito(falhas_para_abrir=2, tempo_aberto=30, relogio=relogio)
+    disjuntor.registrar_falha()
+    assert disjuntor.estado == 'fechado' and disjuntor.permite()
+    disjuntor.registrar_falha()
+    assert disjuntor.estado == 'aberto'
+    relogio.agora = 29.9
+    assert not disjuntor.permite()
+
+def test_disjuntor_meio_aberto_deixa_passar_uma_chamada():
+    relogio = Relogio()
+    disjuntor = disjuntor_aberto(relogio)
+    relogio.agora = 30
+    assert disjuntor.permite()
+    assert disjuntor.estado == 'meio-aberto'
+    assert not disjuntor.permite()
+
+@pytest.mark.parametrize('resultado, estado', [('sucesso', 'fechado'), ('falha', 'aberto')])
+def test_disjuntor_resultado_do_teste(resultado, estado):
+    relogio = Relogio()
+    disjuntor = disjuntor_aberto(relogio)
+    relogio.agora = 30
+    assert disjuntor.permite()
+    getattr(disjuntor, f'registrar_{resultado}')()
+    assert disjuntor.estado == estado
+    assert disjuntor.permite() == (estado == 'fechado')
+
+def test_disjuntor_teste_liberado_volta_a_permitir():
+    relogio = Relogio()
+    disjuntor = disjuntor_aberto(relogio)
+    relogio.agora = 30
+    assert disjuntor.permite()
+    disjuntor.liberar_teste()
+    assert disjuntor.estado == 'aberto'
+    assert disjuntor.permite()
+
+def test_teste_fora_do_prazo_nao_prende_o_disjuntor():
+    relogio = Relogio()
+    motor = despacho_busca.MotorBusca('M', lambda consulta, maximo, timeout: [], disjuntor_aberto(relogio))
+    relogio.agora = 30
+    assert motor.disjuntor.permite()
+    despachante = despacho_busca.DespachanteBusca([motor], max_threads=1)
+    with pytest.raises(TimeoutError):
+        despachante._chamar(motor, 'consulta', 5, fim=0.0)
+    assert motor.disjuntor.permite()
+
+def test_teste_cancelado_na_fila_nao_prende_o_disjuntor():
+    relogio = Relogio()
+    liberar = threading.Event()
+    lento = despacho_busca.MotorBusca('Lento', lambda consulta, maximo, timeout: liberar.wait(5) and [])
+    em_teste = despacho_busca.MotorBusca('Em teste', lambda consulta, maximo, timeout: [], disjuntor_aberto(relogio))
+    relogio.agora = 30
+    # Uma thread só: a chamada de teste fica na fila atrás do motor lento até o prazo
+    despachante = despacho_busca.DespachanteBusca([lento, em_teste], prazo=0.05, max_threads=1)
+    try:
+        resposta = despachante.buscar_em_todos('consulta', 5)
+    finally:
+        liberar.set()
+    assert resposta['erros'] == {'Lento': 'prazo esgotado', 'Em teste': 'prazo esgotado'}
+    relogio.agora = 130
+    assert em_teste.disjuntor.permite()
+
+def test_fusao_por_rrf_sem_urls_repetidas():
+    respostas = {
+        'A': [{'href': 'http://www.exemplo.com/a/'}, {'href': 'https://exemplo.com/b'}],
+        'B': [{'href': 'https://exemplo.com/b?utm_source=x'}, {'href': 'https://exemplo.com/c'}],
+    }
+    fundidos = despacho_busca.fundir_por_rrf(respostas, limite=10)
+    assert [resultado['href'] for resultado in fundidos] == [
+        'https://exemplo.com/b', 'http://www.exemplo.com/a/', 'https://exemplo.com/c'
+    ]
+    assert fundidos[0]['motores'] == ['A', 'B']
+
+def test_web_respondeu_ignora_provedores_locais():
+    relogio = Relogio()
+    local = despacho_busca.MotorBusca('Local', lambda consulta, maximo, timeout: [{'href': 'ticket://1'}])
+    local.local = True
+    fora = despacho_busca.MotorBusca('Fora do ar', lambda consulta, maximo, timeout: [], disjuntor_aberto(relogio))
+    web = despacho_busca.MotorBusca('Web', lambda consulta, maximo, timeout: [{'href': 'https://exemplo.com'}])
+    resposta = despacho_busca.DespachanteBusca([local, fora]).buscar_em_todos('consulta', 5)
+    assert resposta['erros'] == {'Fora do ar': 'disjuntor aberto'} and not resposta['web_respondeu']
+    resposta = despacho_busca.DespachanteBusca([local, fora, web]).buscar_em_todos('consulta', 5)
+    assert resposta['web_respondeu'] and len(resposta['resultados']) == 2
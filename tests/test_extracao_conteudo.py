@@ -0,0 +1,44 @@
+# Testes da extração do conteúdo principal (extracao_conteudo), com os dois parsers.
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import extracao_conteudo  # noqa: E402
+
+PARSERS = ['html.parser'] + (['lxml'] if extracao_conteudo.etree is not None else [])
+
+ARTIGO = ('<p>Para configurar a impressora de rede, abra o painel de controle e '
+          'escolha Dispositivos e Impressoras.</p>'
+          '<p>Depois clique em Adicionar impressora e informe o endereço IP do equipamento.</p>')
+
+# Páginas ASP.NET WebForms envolvem todo o corpo num único <form runat="server">
+PAGINA_ASPNET = f'''<html><head><title>Suporte - Impressoras</title></head><body>
+<form method="post" action="./Artigo.aspx" id="form1">
+<input type="hidden" name="__VIEWSTATE" value="abc" />
+<div class="menu"><a href="/">Início</a> <a href="/artigos">Artigos</a></div>
+<div id="conteudo"><h1>Impressora de rede</h1>{ARTIGO}</div>
+</form></body></html>'''
+
+@pytest.mark.parametrize('parser', PARSERS)
+def test_pagina_dentro_de_form(parser):
+    titulo, conteudo = extracao_conteudo.extrair_conteudo(PAGINA_ASPNET, parser=parser)
+    assert titulo == 'Suporte - Impressoras'
+    assert 'Adicionar impressora' in conteudo
+    assert 'Artigos' not in conteudo
+
+@pytest.mark.parametrize('parser', PARSERS)
+def test_formulario_de_busca_fora_do_conteudo(parser):
+    html = f'''<html><head><title>Artigo</title></head><body>
+    <form action="/busca"><input name="q" /><button>Buscar</button></form>
+    <article>{ARTIGO}</article></body></html>'''
+    _, conteudo = extracao_conteudo.extrair_conteudo(html, parser=parser)
+    assert conteudo.startswith('Para configurar a impressora')
+    assert 'Buscar' not in conteudo
+
+@pytest.mark.parametrize('parser', PARSERS)
+def test_limite_do_conteudo(parser):
+    _, conteudo = extracao_conteudo.extrair_conteudo(f'<article>{ARTIGO}</article>', limite=20, parser=parser)
+    assert conteudo == ARTIGO[3:23] + '...'